@@ -1,3 +1,9 @@
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, Optional, TypedDict, List
 from langgraph.graph import StateGraph, END
 from agents.governance_agents import (
@@ -5,32 +11,41 @@ from agents.governance_agents import (
     suggest_remediation
 )
 from agents.llm_wrapper import call_llm, DEFAULT_MODEL
+from agents.policy_compiler import CompiledPolicy, compile_policy
+from agents.risk_scorer import score_risk
+from core.episodic_memory import SessionMemory
 
 class GovernanceState(TypedDict, total=False):
     simulation: Dict[str, Any]
     policy: Dict[str, Any]
+    compiled_policy: CompiledPolicy
     decision: Dict[str, Any]
     risk_score: int
     risk_reasons: List[str]
+    risk_enrichment_id: str
     remediation: Dict[str, Any]
-    episodic_memory: List[Dict[str, Any]]
+    episodic_memory: SessionMemory
+    enrich: bool
     final_status: Optional[str]
 
+_decision_agent = GovernanceDecisionAgent()
+
 def governance_decision_node(state: GovernanceState) -> GovernanceState:
     simulation: Dict[str, Any] = state.get("simulation", {})
-    policy: Dict[str, Any] = state.get("policy", {})
-    agent = GovernanceDecisionAgent()
-    decision = agent.decide(sandbox_result=simulation, policy=policy)
+    policy = state.get("compiled_policy") or compile_policy(state.get("policy", {}))
+    decision = _decision_agent.decide(sandbox_result=simulation, policy=policy)
 
-    state["decision"] = decision
-    return state
+    return {"decision": decision}
 
-def risk_assessment_node(state: GovernanceState) -> GovernanceState:
-    simulation: Dict[str, Any] = state.get("simulation", {})
-    policy: Dict[str, Any] = state.get("policy", {})
-    episodic_memory: List[Dict[str, Any]] = state.get("episodic_memory", [])
+RISK_LLM_ENRICHMENT = os.getenv("RISK_LLM_ENRICHMENT", "0") == "1"
+RISK_ENRICHMENT_RESULTS = 1024
 
-    prompt = f"""Analyze this database query simulation and assign a risk score from 0-100.
+_enrichment_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="risk-enrichment")
+_enrichments: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_enrichments_lock = threading.Lock()
+
+def _build_risk_prompt(simulation: Dict[str, Any], policy: Dict[str, Any], recent: List[Dict[str, Any]]) -> str:
+    return f"""Analyze this database query simulation and assign a risk score from 0-100.
 
 Simulation Data:
 - Query Type: {simulation.get('query_type', 'Unknown')}
@@ -46,7 +61,7 @@ Policy Context:
 - Max Rows: {policy.get('max_rows')}
 
 Historical Context:
-{chr(10).join([f"- Previous query accessed {len(mem.get('simulation', {}).get('columns_accessed', []))} columns, returned {mem.get('simulation', {}).get('rows_returned', 0)} rows" for mem in episodic_memory[-3:]]) if episodic_memory else "No previous queries"}
+{chr(10).join([f"- Previous query accessed {mem['columns']} columns, returned {mem['rows']} rows" for mem in recent]) if recent else "No previous queries"}
 
 Based on all this information, provide:
 1. Risk Score (0-100): [number only]
@@ -59,91 +74,167 @@ Risk Guidelines:
 - Historical patterns: adjust based on context
 - Policy violations: +50+ points"""
 
+def _parse_llm_risk(analysis: str):
+    lines = analysis.strip().split('\n')
+    risk_score = 0
+    reasons = []
+
+    for line in lines:
+        line_lower = line.lower()
+        if 'risk score' in line_lower and ':' in line:
+            numbers = re.findall(r'\d+', line.split(':', 1)[1])
+            if numbers:
+                risk_score = max(0, min(100, int(numbers[0])))
+        elif 'reason' in line_lower and ':' in line:
+            reason_text = line.split(':', 1)[1].strip()
+            if reason_text and reason_text != '[brief explanation]':
+                reasons.append(reason_text)
+
+    return risk_score, reasons
+
+def _store_enrichment(enrichment_id: str, result: Dict[str, Any]) -> None:
+    with _enrichments_lock:
+        _enrichments[enrichment_id] = result
+        while len(_enrichments) > RISK_ENRICHMENT_RESULTS:
+            _enrichments.popitem(last=False)
+
+def _run_llm_enrichment(enrichment_id: str, simulation: Dict[str, Any], policy: Dict[str, Any],
+                        recent: List[Dict[str, Any]]) -> None:
     try:
         analysis = call_llm(
-            prompt=prompt,
+            prompt=_build_risk_prompt(simulation, policy, recent),
             system_prompt="You are a database security analyst. Provide objective risk assessments based on the provided data.",
             temperature=0.3
         )
+        risk_score, reasons = _parse_llm_risk(analysis)
+        _store_enrichment(enrichment_id, {"status": "done", "risk_score": risk_score, "reasons": reasons})
+    except Exception as e:
+        _store_enrichment(enrichment_id, {"status": "failed", "error": str(e)})
 
-        lines = analysis.strip().split('\n')
-        risk_score = 0
-        reasons = []
-
-        for line in lines:
-            line_lower = line.lower()
-            if 'risk score' in line_lower and ':' in line:
-                try:
-                    score_part = line.split(':', 1)[1].strip()
-                    import re
-                    numbers = re.findall(r'\d+', score_part)
-                    if numbers:
-                        risk_score = int(numbers[0])
-                        risk_score = max(0, min(100, risk_score))
-                except:
-                    pass
-            elif 'reason' in line_lower and ':' in line:
-                reason_text = line.split(':', 1)[1].strip()
-                if reason_text and reason_text != '[brief explanation]':
-                    reasons.append(reason_text)
-
-        if not reasons:
-            if risk_score > 50:
-                reasons.append("High risk query detected")
-            elif risk_score > 20:
-                reasons.append("Moderate risk query detected")
-            else:
-                reasons.append("Low risk query - assessment completed")
-
-        state["risk_score"] = risk_score
-        state["risk_reasons"] = reasons
+def request_risk_enrichment(simulation: Dict[str, Any], policy: Dict[str, Any],
+                            episodic_memory: SessionMemory = None) -> str:
+    """Queue an LLM second opinion on the risk score; never blocks the caller"""
+    enrichment_id = uuid.uuid4().hex
+    recent = episodic_memory.recent(3) if episodic_memory is not None else []
+    _store_enrichment(enrichment_id, {"status": "pending"})
+    _enrichment_executor.submit(_run_llm_enrichment, enrichment_id, simulation, policy, recent)
+    return enrichment_id
 
-    except Exception as e:
-        state["risk_score"] = 50
-        state["risk_reasons"] = [f"Risk assessment failed: {str(e)}"]
+def get_risk_enrichment(enrichment_id: str) -> Optional[Dict[str, Any]]:
+    with _enrichments_lock:
+        return _enrichments.get(enrichment_id)
+
+def risk_assessment_node(state: GovernanceState) -> GovernanceState:
+    simulation: Dict[str, Any] = state.get("simulation", {})
+    policy: Dict[str, Any] = state.get("policy", {})
+    compiled = state.get("compiled_policy") or compile_policy(policy)
+    risk_score, reasons = score_risk(simulation, compiled, state.get("episodic_memory"))
+    return {"risk_score": risk_score, "risk_reasons": reasons}
 
-    return state
+def risk_enrichment_node(state: GovernanceState) -> GovernanceState:
+    enrichment_id = request_risk_enrichment(
+        state.get("simulation", {}), state.get("policy", {}), state.get("episodic_memory")
+    )
+    return {"risk_enrichment_id": enrichment_id}
 
 def remediation_node(state: GovernanceState) -> GovernanceState:
     decision: Dict[str, Any] = state.get("decision", {})
     simulation: Dict[str, Any] = state.get("simulation", {})
     remediation = suggest_remediation(decision=decision, sandbox_result=simulation)
-    state["remediation"] = remediation
-    return state
+    return {"remediation": remediation}
+
+def route_after_decision(state: GovernanceState) -> List[str]:
+    """Risk and remediation only need the decision, so they run side by side.
+    A DENY is final, so it never waits on (or pays for) the LLM enrichment."""
+    branches = ["risk_assessment", "remediation"]
+    if RISK_LLM_ENRICHMENT and state.get("enrich", True) and state.get("decision", {}).get("decision") != "DENY":
+        branches.append("risk_enrichment")
+    return branches
+
+NODES = {
+    "governance_decision": governance_decision_node,
+    "risk_assessment": risk_assessment_node,
+    "risk_enrichment": risk_enrichment_node,
+    "remediation": remediation_node,
+}
 
 class GovernanceOrchestrator:
-    def __init__(self) -> None:
+    """Governance pipeline: decision, then risk, remediation and (optionally) LLM enrichment.
+
+    Without an LLM node configured every node is a pure function, so by default
+    `run` calls them directly instead of going through LangGraph's scheduler;
+    the graph is used whenever the enrichment node can be routed to. Both paths
+    produce the same result. `fast_path` forces either one.
+    """
+
+    def __init__(self, fast_path: bool = None) -> None:
+        self.fast_path = not RISK_LLM_ENRICHMENT if fast_path is None else fast_path
         graph = StateGraph(GovernanceState)
 
-        graph.add_node("governance_decision", governance_decision_node)
-        graph.add_node("risk_assessment", risk_assessment_node)
-        graph.add_node("remediation", remediation_node)
+        for name, node in NODES.items():
+            graph.add_node(name, node)
 
         graph.set_entry_point("governance_decision")
 
-        graph.add_edge("governance_decision", "risk_assessment")
-        graph.add_edge("risk_assessment", "remediation")
+        graph.add_conditional_edges(
+            "governance_decision",
+            route_after_decision,
+            ["risk_assessment", "risk_enrichment", "remediation"]
+        )
+        graph.add_edge("risk_assessment", END)
+        graph.add_edge("risk_enrichment", END)
         graph.add_edge("remediation", END)
 
         self.app = graph.compile()
 
-    def run(self, sandbox_result: Dict[str, Any], policy: Dict[str, Any], episodic_memory: list = None) -> Dict[str, Any]:
-
-        initial_state: GovernanceState = {
+    def _initial_state(self, sandbox_result: Dict[str, Any], policy: Dict[str, Any], episodic_memory: SessionMemory,
+                       compiled_policy: CompiledPolicy, enrich: bool = True) -> GovernanceState:
+        return {
             "simulation": sandbox_result,
             "policy": policy,
-            "episodic_memory": episodic_memory or [],
+            "compiled_policy": compiled_policy or compile_policy(policy),
+            "episodic_memory": episodic_memory,
+            "enrich": enrich,
         }
 
-        final_state = self.app.invoke(initial_state)
-
+    def _result(self, final_state: GovernanceState) -> Dict[str, Any]:
         risk_assessment = {
             "risk_score": final_state.get("risk_score", 50),
             "reasons": final_state.get("risk_reasons", ["Assessment completed"])
         }
+        if final_state.get("risk_enrichment_id"):
+            risk_assessment["llm_enrichment_id"] = final_state["risk_enrichment_id"]
 
         return {
             "decision": final_state.get("decision", {}),
             "risk": risk_assessment,
             "remediation": final_state.get("remediation", {}),
-        }
\ No newline at end of file
+        }
+
+    def _run_direct(self, state: GovernanceState) -> GovernanceState:
+        """The graph's schedule as plain calls: the decision node, then each routed branch"""
+        state = dict(state)
+        state.update(governance_decision_node(state))
+        updates = [NODES[branch](state) for branch in route_after_decision(state)]
+        for update in updates:
+            state.update(update)
+        return state
+
+    def decide(self, sandbox_result: Dict[str, Any], compiled_policy: CompiledPolicy) -> Dict[str, Any]:
+        """Policy decision alone, without risk or remediation"""
+        return _decision_agent.decide(sandbox_result=sandbox_result, policy=compiled_policy)
+
+    def run(self, sandbox_result: Dict[str, Any], policy: Dict[str, Any], episodic_memory: SessionMemory = None,
+            compiled_policy: CompiledPolicy = None, enrich: bool = True) -> Dict[str, Any]:
+        """Full governance pass; `enrich=False` never queues the LLM risk enrichment"""
+        initial_state = self._initial_state(sandbox_result, policy, episodic_memory, compiled_policy, enrich)
+        if self.fast_path or not enrich:
+            return self._result(self._run_direct(initial_state))
+        return self._result(self.app.invoke(initial_state))
+
+    async def arun(self, sandbox_result: Dict[str, Any], policy: Dict[str, Any], episodic_memory: SessionMemory = None,
+                   compiled_policy: CompiledPolicy = None, enrich: bool = True) -> Dict[str, Any]:
+        initial_state = self._initial_state(sandbox_result, policy, episodic_memory, compiled_policy, enrich)
+        if self.fast_path or not enrich:
+            return self._result(self._run_direct(initial_state))
+        return self._result(await self.app.ainvoke(initial_state))
@@ -0,0 +1,145 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+COLUMN_CLASSIFICATION_FILE = os.getenv("COLUMN_CLASSIFICATION_FILE")
+UNKNOWN_COLUMN_MEMO_SIZE = 4096
+
+# Most sensitive first; a column name shared by several tables takes the most sensitive class
+SEVERITY = {"BLOCKED": 2, "PII": 1, "PUBLIC": 0}
+
+# Pattern rules for columns without an override, tried in order. Patterns match
+# whole underscore-separated words, so foreign keys such as "account_id" are
+# keys rather than personal identifiers and "renamed_at" is not a "name".
+DEFAULT_RULES: Tuple[Tuple[str, str], ...] = (
+    (r"(?:\w+_)?(?:ssn|social_security(?:_number)?|passport(?:_number)?|national_id|tax_id)(?:_\w+)?", "PII"),
+    (r"(?:\w+_)?id", "PUBLIC"),
+    (r"(?:\w+_)?(?:e_?mail|phone|mobile|address|street|zip(?:_code)?|postcode)(?:_\w+)?", "PII"),
+    (r"(?:\w+_)?(?:(?:first|last|full|middle|user)_?)?name", "PII"),
+    (r"(?:\w+_)?(?:dob|date_of_birth|birth_?date)", "PII"),
+)
+
+class ColumnClassificationIndex:
+    """Classification of every known column, precomputed from the schema.
+
+    Known `table.column` pairs and bare column names resolve with one dict
+    lookup. Unknown columns go through the pattern rules, compiled into a
+    single alternation where the first matching rule wins, and the result is
+    memoized. Any change to the schema, overrides or rules rebuilds the index
+    and bumps `version`.
+    """
+
+    def __init__(self, schema: dict = None, overrides: Dict[str, str] = None,
+                 rules: Iterable[Tuple[str, str]] = DEFAULT_RULES, default: str = "PUBLIC"):
+        self._lock = threading.Lock()
+        self.version = 0
+        self.default = default
+        self._schema = schema or {}
+        self._overrides = dict(overrides or {})
+        self._rules = tuple(rules)
+        self._listeners = []
+        self._rebuild()
+
+    def subscribe(self, callback) -> None:
+        """Call `callback()` after every rebuild, e.g. to drop cached classifications"""
+        self._listeners.append(callback)
+
+    def _rebuild(self) -> None:
+        matcher = re.compile("|".join(
+            f"(?P<r{i}>{pattern})" for i, (pattern, _) in enumerate(self._rules)
+        ), re.IGNORECASE) if self._rules else None
+        rule_classes = {f"r{i}": cls for i, (_, cls) in enumerate(self._rules)}
+        overrides = {key.lower(): cls for key, cls in self._overrides.items()}
+
+        def by_rules(column: str) -> str:
+            match = matcher.fullmatch(column) if matcher else None
+            return rule_classes[match.lastgroup] if match else self.default
+
+        qualified, bare = {}, {}
+        for table, columns in self._schema.items():
+            for column in columns:
+                key = f"{table}.{column}".lower()
+                cls = overrides.get(key) or overrides.get(column.lower()) or by_rules(column)
+                qualified[key] = cls
+                current = bare.get(column.lower())
+                if current is None or SEVERITY.get(cls, 0) > SEVERITY.get(current, 0):
+                    bare[column.lower()] = cls
+        for key, cls in overrides.items():
+            if "." not in key:
+                bare[key] = cls
+
+        with self._lock:
+            self._by_rules = by_rules
+            self._qualified = qualified
+            self._bare = bare
+            self._unknown = {}
+            self.version += 1
+        for callback in self._listeners:
+            callback()
+
+    def update(self, schema: dict = None, overrides: Dict[str, str] = None,
+               rules: Iterable[Tuple[str, str]] = None) -> None:
+        if schema is not None:
+            self._schema = schema
+        if overrides is not None:
+            self._overrides = dict(overrides)
+        if rules is not None:
+            self._rules = tuple(rules)
+        self._rebuild()
+
+    def classify(self, column: str, table: Optional[str] = None) -> str:
+        key = column.lower()
+        if table is not None:
+            cls = self._qualified.get(f"{table}.{column}".lower())
+            if cls is not None:
+                return cls
+        cls = self._bare.get(key)
+        if cls is None:
+            cls = self._unknown.get(key)
+            if cls is None:
+                if len(self._unknown) >= UNKNOWN_COLUMN_MEMO_SIZE:
+                    self._unknown = {}
+                cls = self._unknown[key] = self._by_rules(column)
+        return cls
+
+    def classify_columns(self, columns: List[str], tables: Iterable[str] = None) -> Dict[str, str]:
+        tables = list(tables or ())
+        if len(tables) == 1:
+            return {col: self.classify(col, tables[0]) for col in columns}
+        return {col: self.classify(col) for col in columns}
+
+    def classify_reads(self, reads: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+        """Classify (table, column) pairs by column name, keeping the most sensitive class per name"""
+        classification = {}
+        for table, column in reads:
+            cls = self.classify(column, table)
+            if SEVERITY.get(cls, 0) >= SEVERITY.get(classification.get(column), -1):
+                classification[column] = cls
+        return classification
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "known_columns": len(self._qualified),
+            "overrides": len(self._overrides),
+            "rules": len(self._rules),
+            "unknown_memoized": len(self._unknown)
+        }
+
+def load_overrides(path: str = COLUMN_CLASSIFICATION_FILE) -> Dict[str, str]:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+_index = ColumnClassificationIndex(overrides=load_overrides())
+
+def get_classification_index() -> ColumnClassificationIndex:
+    return _index
+
+def configure_classification_index(schema: dict = None, overrides: Dict[str, str] = None,
+                                   rules: Iterable[Tuple[str, str]] = None) -> ColumnClassificationIndex:
+    _index.update(schema=schema, overrides=overrides, rules=rules)
+    return _index
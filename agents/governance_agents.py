@@ -1,40 +1,89 @@
+import threading
+from collections import OrderedDict
+from agents.policy_compiler import compile_policy
+from core.episodic_memory import pii_columns
+
+DECISION_MEMO_SIZE = 4096
+
 class GovernanceDecisionAgent:
-    def decide(self, sandbox_result: dict, policy: dict) -> dict:
+    """Evaluates a simulation against a compiled policy.
+
+    Decisions depend only on (policy hash, query type, column signature), so they
+    are memoized on that key and repeated shapes cost a dict lookup.
+    """
+
+    def __init__(self, memo_size: int = DECISION_MEMO_SIZE):
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def decide(self, sandbox_result: dict, policy) -> dict:
+        compiled = compile_policy(policy)
         query_type = sandbox_result.get("query_type", "SELECT")
         classifications = sandbox_result.get("column_classification", {})
-        accessed_types = set(classifications.values())
-        accessed_columns = set(sandbox_result.get("columns_accessed", []))
-        explanation = []
+        accessed_columns = frozenset(sandbox_result.get("columns_accessed", []))
+        indirect_columns = frozenset(sandbox_result.get("indirect_columns", []))
+        source_pii = frozenset(
+            col for col, kind in sandbox_result.get("source_classification", {}).items() if kind == "PII"
+        )
+        key = (compiled.policy_hash, query_type, accessed_columns, frozenset(classifications.values()),
+               indirect_columns, source_pii)
 
-        pii_accessed = "PII" in accessed_types
+        with self._lock:
+            decision = self._memo.get(key)
+            if decision is not None:
+                self._memo.move_to_end(key)
+        if decision is None:
+            decision = self._evaluate(compiled, query_type, key[3], accessed_columns, indirect_columns, source_pii)
+            with self._lock:
+                self._memo[key] = decision
+                while len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+
+        result = dict(decision)
+        if "columns_to_filter" in result:
+            result["columns_to_filter"] = list(result["columns_to_filter"])
+        return result
+
+    def _evaluate(self, compiled, query_type: str, accessed_types: frozenset, accessed_columns: frozenset,
+                  indirect_columns: frozenset = frozenset(), source_pii: frozenset = frozenset()) -> dict:
+        explanation = []
+        # Source columns are what SQLite reads, so PII behind an alias or an expression still counts
+        pii_accessed = "PII" in accessed_types or bool(source_pii)
+        # Filtering and masking only reach output columns; anything used elsewhere is denied
+        blocked_indirect = sorted(indirect_columns & compiled.blocked_columns)
 
         if query_type == "UPDATE":
             explanation.append("UPDATE operation detected.")
 
-            if pii_accessed:
+            if pii_accessed and ("PII" in accessed_types or compiled.pii_mode != "allow"):
                 explanation.append("UPDATE operation involves PII data.")
-                if policy.get("deny_pii_access", False) or policy.get("deny_pii", False):
+                if compiled.pii_mode == "deny":
                     explanation.append("Policy strictly denies PII modifications.")
-                    return {
-                        "decision": "DENY",
-                        "explanation": " ".join(explanation)
-                    }
                 else:
                     explanation.append("PII modification requires additional approval.")
-                    return {
-                        "decision": "DENY",
-                        "explanation": " ".join(explanation)
-                    }
+                return {
+                    "decision": "DENY",
+                    "explanation": " ".join(explanation)
+                }
 
-            blocked_columns = set(policy.get("blocked_columns", []))
-            violated_blocked = sorted(accessed_columns & blocked_columns)
+            violated_blocked = sorted(accessed_columns & compiled.blocked_columns)
             if violated_blocked:
                 explanation.append(
                     f"UPDATE operation cannot modify blocked column(s): {', '.join(violated_blocked)}."
                 )
                 return {
                     "decision": "DENY",
-                    "columns_to_filter": violated_blocked,
+                    "columns_to_filter": tuple(violated_blocked),
+                    "explanation": " ".join(explanation)
+                }
+
+            if blocked_indirect:
+                explanation.append(
+                    f"UPDATE operation reads blocked column(s): {', '.join(blocked_indirect)}."
+                )
+                return {
+                    "decision": "DENY",
                     "explanation": " ".join(explanation)
                 }
 
@@ -44,36 +93,55 @@ class GovernanceDecisionAgent:
             if pii_accessed:
                 explanation.append("Query accessed PII data.")
 
-                if policy.get("deny_pii_access", False) or policy.get("deny_pii", False):
+                if compiled.pii_mode == "deny":
                     explanation.append("Policy denies access to PII data.")
                     return {
                         "decision": "DENY",
                         "explanation": " ".join(explanation)
                     }
-                if policy.get("mask_pii", False):
-                    explanation.append("Policy requires masking of PII data.")
-                    return {
-                        "decision": "ALLOW_WITH_MASKING",
-                        "explanation": " ".join(explanation)
-                    }
 
-            allowed_tables = policy.get("allowed_tables", [])
-            if allowed_tables:
+            if compiled.allowed_tables:
                 explanation.append("Table access restrictions configured but not yet implemented.")
                 return {
                     "decision": "DENY",
                     "explanation": " ".join(explanation)
                 }
 
-            blocked_columns = set(policy.get("blocked_columns", []))
-            violated_blocked = sorted(accessed_columns & blocked_columns)
+            if blocked_indirect:
+                explanation.append(
+                    f"Blocked column(s) used outside the select list: {', '.join(blocked_indirect)}."
+                )
+                return {
+                    "decision": "DENY",
+                    "explanation": " ".join(explanation)
+                }
+
+            # Masking adds to filtering: blocked columns are still dropped from a masked result
+            violated_blocked = sorted(accessed_columns & compiled.blocked_columns)
             if violated_blocked:
                 explanation.append(
                     f"Blocked column(s) will be filtered from results: {', '.join(violated_blocked)}."
                 )
+            if pii_accessed and compiled.pii_mode == "mask":
+                unmaskable = sorted(indirect_columns & source_pii)
+                if unmaskable:
+                    explanation.append(
+                        f"PII column(s) used outside the select list cannot be masked: {', '.join(unmaskable)}."
+                    )
+                    return {
+                        "decision": "DENY",
+                        "explanation": " ".join(explanation)
+                    }
+                explanation.append("Policy requires masking of PII data.")
+                return {
+                    "decision": "ALLOW_WITH_MASKING",
+                    "columns_to_filter": tuple(violated_blocked),
+                    "explanation": " ".join(explanation)
+                }
+            if violated_blocked:
                 return {
                     "decision": "ALLOW_WITH_FILTERING",
-                    "columns_to_filter": violated_blocked,
+                    "columns_to_filter": tuple(violated_blocked),
                     "explanation": " ".join(explanation)
                 }
 
@@ -85,12 +153,11 @@ class GovernanceDecisionAgent:
 
 def suggest_remediation(decision: dict, sandbox_result: dict) -> dict:
     suggestions = []
-    classifications = sandbox_result.get("column_classification", {})
 
     if decision['decision'] == "DENY":
-        pii_columns = [col for col, c in classifications.items() if c == "PII"]
-        if pii_columns:
-            suggestions.append(f"Remove or mask PII columns: {', '.join(pii_columns)}")
+        pii = pii_columns(sandbox_result)
+        if pii:
+            suggestions.append(f"Remove or mask PII columns: {', '.join(pii)}")
 
     if decision['decision'] == "ALLOW_WITH_MASKING":
         suggestions.append("Apply masking to sensitive fields.")
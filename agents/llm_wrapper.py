@@ -1,26 +1,162 @@
 import os
-from typing import List
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Tuple
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import AIMessage, SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
 
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 DEFAULT_MODEL = os.getenv("LLM_MODEL", "llama-3.1-8b-instant")
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "0"))
 
-def _build_groq_llm(model: str, temperature: float) -> ChatGroq:
-    if not GROQ_API_KEY:
-        raise RuntimeError("GROQ_API_KEY is not set")
+class LLMBackend(ABC):
+    """Creates chat clients; clients are cached per (backend, model, temperature)"""
+    name = "base"
 
-    return ChatGroq(
-        api_key=GROQ_API_KEY,
-        model=model,
-        temperature=temperature,
-    )
+    @abstractmethod
+    def create_client(self, model: str, temperature: float):
+        ...
 
-def get_llm(model: str = DEFAULT_MODEL, temperature: float = 0.0) -> ChatGroq:
-    return _build_groq_llm(model, temperature)
+class GroqBackend(LLMBackend):
+    name = "groq"
+
+    def __init__(self):
+        self._http_client = None
+        self._http_async_client = None
+        self._lock = threading.Lock()
+
+    def _http_clients(self):
+        # One keep-alive connection pool shared by every Groq client
+        with self._lock:
+            if self._http_client is None:
+                import httpx
+                limits = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+                self._http_client = httpx.Client(limits=limits, timeout=60.0)
+                self._http_async_client = httpx.AsyncClient(limits=limits, timeout=60.0)
+            return self._http_client, self._http_async_client
+
+    def create_client(self, model: str, temperature: float) -> ChatGroq:
+        if not GROQ_API_KEY:
+            raise RuntimeError("GROQ_API_KEY is not set")
+
+        http_client, http_async_client = self._http_clients()
+        return ChatGroq(
+            api_key=GROQ_API_KEY,
+            model=model,
+            temperature=temperature,
+            http_client=http_client,
+            http_async_client=http_async_client,
+        )
+
+def _prompt_text(value: Any) -> str:
+    if hasattr(value, "to_string"):
+        return value.to_string()
+    if isinstance(value, list):
+        return "\n".join(str(getattr(message, "content", message)) for message in value)
+    return str(value)
+
+def _stub_text(prompt: str) -> str:
+    if "risk score" in prompt.lower():
+        return "Risk Score: 50\nRisk Reasons: Stub backend assessment"
+    return "Stub response generated without a language model."
+
+def _stub_structured(schema, prompt: str):
+    lowered = prompt.lower()
+    fields = getattr(schema, "model_fields", {})
+
+    if "sql" in fields:
+        request = lowered.split("user request:")[-1]
+        table = "transactions"
+        for candidate in ("accounts", "vendors", "transactions", "budgets"):
+            if candidate in request or candidate.rstrip("s") in request:
+                table = candidate
+                break
+        return schema(
+            intent=request.strip() or "query data",
+            action="query",
+            sql=f"SELECT * FROM {table} LIMIT 10"
+        )
+
+    if "max_rows" in fields:
+        text = lowered.split("policy text:")[-1]
+        limit = re.search(r"(\d+)\s*rows", text)
+        return schema(
+            max_rows=int(limit.group(1)) if limit else None,
+            deny_pii="pii" in text and any(word in text for word in ("block", "deny", "no ")),
+        )
+
+    return schema.model_construct()
+
+class StubChatModel:
+    """Deterministic stand-in for a chat model, for offline runs and benchmarks"""
+
+    def __init__(self, model: str, temperature: float, latency_ms: float = LLM_STUB_LATENCY_MS,
+                 responder: Callable[[str], str] = _stub_text):
+        self.model = model
+        self.temperature = temperature
+        self.latency_ms = latency_ms
+        self.responder = responder
+
+    def _wait(self) -> None:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def invoke(self, messages, config=None, **kwargs) -> AIMessage:
+        self._wait()
+        return AIMessage(content=self.responder(_prompt_text(messages)))
+
+    def with_structured_output(self, schema, **kwargs) -> RunnableLambda:
+        def respond(value):
+            self._wait()
+            return _stub_structured(schema, _prompt_text(value))
+        return RunnableLambda(respond)
+
+class StubBackend(LLMBackend):
+    name = "stub"
+
+    def __init__(self, latency_ms: float = LLM_STUB_LATENCY_MS, responder: Callable[[str], str] = _stub_text):
+        self.latency_ms = latency_ms
+        self.responder = responder
+
+    def create_client(self, model: str, temperature: float) -> StubChatModel:
+        return StubChatModel(model, temperature, latency_ms=self.latency_ms, responder=self.responder)
+
+_backends: Dict[str, LLMBackend] = {"groq": GroqBackend(), "stub": StubBackend()}
+_active_backend = LLM_BACKEND
+_clients: Dict[Tuple[str, str, float], Any] = {}
+_clients_lock = threading.Lock()
+
+def register_backend(backend: LLMBackend) -> None:
+    with _clients_lock:
+        _backends[backend.name] = backend
+        for key in [key for key in _clients if key[0] == backend.name]:
+            del _clients[key]
+
+def set_backend(name: str) -> None:
+    global _active_backend
+    if name not in _backends:
+        raise ValueError(f"Unknown LLM backend: {name}")
+    _active_backend = name
+
+def get_backend() -> LLMBackend:
+    return _backends[_active_backend]
+
+def get_llm(model: str = DEFAULT_MODEL, temperature: float = 0.0):
+    key = (_active_backend, model, temperature)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = _backends[key[0]].create_client(model, temperature)
+    return client
 
 def call_llm(
     *,
@@ -34,6 +170,5 @@ def call_llm(
         HumanMessage(content=prompt),
     ]
 
-    groq_llm = _build_groq_llm(model=model, temperature=temperature)
-    response = groq_llm.invoke(messages)
-    return response.content
\ No newline at end of file
+    response = get_llm(model=model, temperature=temperature).invoke(messages)
+    return response.content
@@ -1,14 +1,10 @@
 from agents.llm_wrapper import get_llm, DEFAULT_MODEL
+from agents.plan_cache import PlanCache
 from agents.tools import SQLPlan
 from langchain_core.prompts import ChatPromptTemplate
 
-class NaturalLanguageAgent:
-    def __init__(self):
-        self.llm = get_llm(DEFAULT_MODEL, 0.0)
-
-    def interpret(self, user_input: str, schema_hint: str) -> dict:
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an enterprise data agent. Convert user requests into SQL queries.
+NL_TO_SQL_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an enterprise data agent. Convert user requests into SQL queries.
 Rules:
 - SQL can be SELECT or UPDATE queries
 - Use safe, minimal queries
@@ -16,18 +12,33 @@ Rules:
 - Schema: {schema_hint}
 
 {format_instructions}"""),
-            ("human", "User Request: {user_input}")
-        ])
+    ("human", "User Request: {user_input}")
+])
+
+SQL_PLAN_FORMAT_INSTRUCTIONS = SQLPlan.schema_json()
+
+class NaturalLanguageAgent:
+    def __init__(self, plan_cache: PlanCache = None):
+        self.llm = get_llm(DEFAULT_MODEL, 0.0)
+        self.chain = NL_TO_SQL_PROMPT | self.llm.with_structured_output(SQLPlan)
+        self.plan_cache = plan_cache or PlanCache()
+
+    def interpret(self, user_input: str, schema_hint: str) -> dict:
+        cached = self.plan_cache.get(user_input, schema_hint)
+        if cached is not None:
+            return cached
 
-        chain = prompt | self.llm.with_structured_output(SQLPlan)
-        result = chain.invoke({
+        result = self.chain.invoke({
             "user_input": user_input,
             "schema_hint": schema_hint,
-            "format_instructions": SQLPlan.schema_json()
+            "format_instructions": SQL_PLAN_FORMAT_INSTRUCTIONS
         })
 
-        return {
+        plan = {
             "intent": result.intent,
             "action": result.action,
             "sql": result.sql
-        }
\ No newline at end of file
+        }
+        if plan["sql"]:
+            self.plan_cache.put(user_input, schema_hint, plan)
+        return plan
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+NL_PLAN_CACHE_ENTRIES = int(os.getenv("NL_PLAN_CACHE_ENTRIES", "512"))
+NL_PLAN_CACHE_TTL = float(os.getenv("NL_PLAN_CACHE_TTL", "3600"))
+# Token-set Jaccard similarity needed to reuse a cached plan for a paraphrase; 0 disables
+NL_PLAN_CACHE_SIMILARITY = float(os.getenv("NL_PLAN_CACHE_SIMILARITY", "0"))
+
+STOPWORDS = frozenset({
+    "a", "an", "the", "me", "my", "our", "us", "please", "show", "give", "get", "list", "find",
+    "what", "which", "are", "is", "of", "for", "to", "in", "on", "all", "can", "you", "i", "want", "see"
+})
+
+# Words, whole numeric literals and comparison/arithmetic operators; other punctuation is noise
+_TOKEN = re.compile(r"\d+(?:\.\d+)?|[a-z_][a-z0-9_]*|<>|[<>!=]=?|[-+*/%]")
+
+def normalize_request(user_input: str) -> str:
+    return " ".join(_TOKEN.findall(user_input.lower()))
+
+def _literal(token: str) -> bool:
+    """Numbers and operators, which a paraphrase must repeat exactly"""
+    return not (token[0].isalpha() or token[0] == "_")
+
+def request_tokens(normalized: str) -> frozenset:
+    return frozenset(token for token in normalized.split() if token not in STOPWORDS)
+
+def schema_fingerprint(schema_hint: str) -> str:
+    return hashlib.sha1(schema_hint.encode()).hexdigest()
+
+class PlanCache:
+    """TTL/LRU cache of NL-to-SQL plans keyed on normalized request and schema.
+
+    With a similarity threshold set, a miss falls back to the cached request
+    with the most similar token set, provided every number and operator in the
+    two requests matches ("top 10" never reuses a "top 20" plan, "> 1000" never
+    reuses a "< 1000" one).
+    """
+
+    def __init__(self, max_entries: int = NL_PLAN_CACHE_ENTRIES, ttl: float = NL_PLAN_CACHE_TTL,
+                 similarity_threshold: float = NL_PLAN_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def get(self, user_input: str, schema_hint: str) -> Optional[dict]:
+        normalized = normalize_request(user_input)
+        key = (schema_fingerprint(schema_hint), normalized)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[0])
+            if entry is not None:
+                del self._entries[key]
+
+            if self.similarity_threshold > 0:
+                match = self._nearest(key[0], request_tokens(normalized), now)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self.near_hits += 1
+                    return dict(self._entries[match][0])
+
+            self.misses += 1
+            return None
+
+    def _nearest(self, schema_key: str, tokens: frozenset, now: float):
+        if not tokens:
+            return None
+        literals = {token for token in tokens if _literal(token)}
+        best_key, best_score = None, self.similarity_threshold
+        for key, (_, cached_tokens, expires_at) in self._entries.items():
+            if key[0] != schema_key or expires_at <= now:
+                continue
+            if literals != {token for token in cached_tokens if _literal(token)}:
+                continue
+            score = len(tokens & cached_tokens) / len(tokens | cached_tokens)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def put(self, user_input: str, schema_hint: str, plan: dict) -> None:
+        normalized = normalize_request(user_input)
+        key = (schema_fingerprint(schema_hint), normalized)
+        with self._lock:
+            self._entries[key] = (dict(plan), request_tokens(normalized), time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.near_hits) / lookups, 4) if lookups else 0.0
+            }
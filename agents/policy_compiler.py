@@ -0,0 +1,78 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    """Immutable, precomputed view of a policy dict from active_policy.json"""
+    policy_hash: str
+    blocked_columns: frozenset
+    allowed_tables: frozenset
+    pii_mode: str  # "deny", "mask" or "allow"
+    max_rows: Optional[int]
+    masking: Tuple[Tuple[str, str], ...]  # (column or classification, strategy)
+    source: str  # canonical JSON of the original policy
+
+    def to_dict(self) -> dict:
+        return json.loads(self.source)
+
+_COMPILED_CACHE_SIZE = 128
+_compiled = OrderedDict()
+_compiled_lock = threading.Lock()
+
+def compile_policy(policy) -> CompiledPolicy:
+    if isinstance(policy, CompiledPolicy):
+        return policy
+    policy = policy or {}
+    source = json.dumps(policy, sort_keys=True, default=str)
+    digest = hashlib.sha256(source.encode()).hexdigest()
+
+    with _compiled_lock:
+        cached = _compiled.get(digest)
+        if cached is not None:
+            _compiled.move_to_end(digest)
+            return cached
+
+    if policy.get("deny_pii_access", False) or policy.get("deny_pii", False):
+        pii_mode = "deny"
+    elif policy.get("mask_pii", False):
+        pii_mode = "mask"
+    else:
+        pii_mode = "allow"
+
+    max_rows = policy.get("max_rows")
+    compiled = CompiledPolicy(
+        policy_hash=digest,
+        blocked_columns=frozenset(policy.get("blocked_columns") or []),
+        allowed_tables=frozenset(policy.get("allowed_tables") or []),
+        pii_mode=pii_mode,
+        max_rows=int(max_rows) if max_rows else None,
+        masking=tuple(sorted((policy.get("masking") or {}).items())),
+        source=source
+    )
+
+    with _compiled_lock:
+        _compiled[digest] = compiled
+        while len(_compiled) > _COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return compiled
+
+def mark_blocked_columns(simulation: dict, policy) -> dict:
+    """Copy of `simulation` with the policy's blocked columns classified as BLOCKED.
+
+    The original is left alone so a cached simulation can be marked for any policy.
+    """
+    blocked = compile_policy(policy).blocked_columns
+    classification = dict(simulation.get("column_classification", {}))
+    for col in simulation.get("columns_accessed", []):
+        if col in blocked:
+            classification[col] = "BLOCKED"
+    marked = dict(simulation, column_classification=classification)
+    if "source_classification" in simulation:
+        marked["source_classification"] = {
+            col: "BLOCKED" if col in blocked else kind for col, kind in simulation["source_classification"].items()
+        }
+    return marked
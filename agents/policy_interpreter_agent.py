@@ -20,6 +20,7 @@ class PolicyInterpreterAgent:
         return {
             "max_rows": result.max_rows,
             "deny_pii": result.deny_pii,
+            "mask_pii": result.mask_pii,
             "blocked_columns": result.blocked_columns,
             "allowed_tables": result.allowed_tables
         }
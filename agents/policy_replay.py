@@ -0,0 +1,176 @@
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from agents.column_classifier import get_classification_index
+from agents.governance_agents import GovernanceDecisionAgent
+from agents.policy_compiler import CompiledPolicy, compile_policy
+from core.audit_logger import DB_PATH
+from core.connection_pool import get_pool
+
+REPLAY_WORKERS = int(os.getenv("REPLAY_WORKERS", "4"))
+REPLAY_DEFAULT_WINDOW_DAYS = int(os.getenv("REPLAY_DEFAULT_WINDOW_DAYS", "7"))
+
+REPLAY_FETCH_SIZE = 10000
+
+# Everything the decision depends on, pulled out of the stored simulation with a
+# single JSON parse per row. Counting the resulting keys in a dict is several
+# times faster than a GROUP BY, which has to sort millions of long strings.
+SHAPES_SQL = """
+    SELECT json_extract(simulation, '$.valid', '$.query_type', '$.tables_accessed', '$.columns_accessed',
+                        '$.column_classification', '$.source_classification', '$.indirect_columns')
+    FROM audit_logs
+    WHERE id BETWEEN ? AND ? AND timestamp >= ? AND timestamp < ? AND source = 'kernel' AND json_valid(simulation)
+"""
+
+# A separate agent so a replay's shapes do not evict the serving path's memo
+_decision_agent = GovernanceDecisionAgent()
+
+def _id_range(conn, since: str, until: str) -> Tuple[Optional[int], Optional[int]]:
+    return conn.execute(
+        "SELECT MIN(id), MAX(id) FROM audit_logs WHERE timestamp >= ? AND timestamp < ?", (since, until)
+    ).fetchone()
+
+def _count_shapes(db_path: str, low: int, high: int, since: str, until: str) -> Counter:
+    shapes = Counter()
+    with get_pool(db_path).connection() as conn:
+        cursor = conn.execute(SHAPES_SQL, (low, high, since, until))
+        while True:
+            rows = cursor.fetchmany(REPLAY_FETCH_SIZE)
+            if not rows:
+                break
+            shapes.update(row[0] for row in rows)
+    return shapes
+
+def _chunks(low: int, high: int, parts: int) -> List[Tuple[int, int]]:
+    step = max((high - low + parts) // parts, 1)
+    return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+def _simulation(shape: list, compiled: CompiledPolicy) -> dict:
+    """Rebuild the decision inputs of a stored simulation as the candidate policy would see them.
+
+    Stored classifications carry the BLOCKED marks of the policy that was active
+    at the time, so those columns are classified again before the policy's own
+    blocked columns are marked.
+    """
+    _, query_type, tables, columns, classification, source_classification, indirect = shape
+    tables, columns = tables or [], columns or []
+    index = get_classification_index()
+    table = tables[0] if len(tables) == 1 else None
+
+    def reclassify(stored: dict) -> dict:
+        classes = dict(stored or {})
+        for column, kind in classes.items():
+            if column in compiled.blocked_columns:
+                classes[column] = "BLOCKED"
+            elif kind == "BLOCKED":
+                classes[column] = index.classify(column, table)
+        return classes
+
+    return {
+        "query_type": query_type or "SELECT",
+        "tables_accessed": tables,
+        "columns_accessed": columns,
+        "column_classification": reclassify(classification),
+        "source_classification": reclassify(source_classification),
+        "indirect_columns": indirect or [],
+    }
+
+def _effect(shape: list, compiled: CompiledPolicy) -> Tuple[str, frozenset, frozenset]:
+    """(decision, filtered columns, masked columns) of one shape under one policy"""
+    simulation = _simulation(shape, compiled)
+    decision = _decision_agent.decide(simulation, compiled)
+    verdict = decision["decision"]
+    filtered = frozenset(decision.get("columns_to_filter", ())) if verdict != "DENY" else frozenset()
+    masked = frozenset(
+        column for column, kind in simulation["column_classification"].items() if kind == "PII"
+    ) - filtered if verdict == "ALLOW_WITH_MASKING" else frozenset()
+    return verdict, filtered, masked
+
+def _bucket() -> dict:
+    return {"records": 0, "by_table": Counter(), "by_column": Counter()}
+
+def _add(bucket: dict, count: int, tables, columns) -> None:
+    bucket["records"] += count
+    for table in tables:
+        bucket["by_table"][table] += count
+    for column in columns:
+        bucket["by_column"][column] += count
+
+def _finish(bucket: dict) -> dict:
+    return {
+        "records": bucket["records"],
+        "by_table": dict(bucket["by_table"].most_common()),
+        "by_column": dict(bucket["by_column"].most_common()),
+    }
+
+def replay_policy(candidate, since: str = None, until: str = None, baseline=None,
+                  workers: int = REPLAY_WORKERS, db_path: str = DB_PATH) -> dict:
+    """Diff the decisions `candidate` would have made against `baseline` (usually the active policy).
+
+    Only stored simulations are used: nothing is executed and no LLM is called.
+    Audit rows are grouped by decision-relevant shape in SQLite, split by id
+    range across `workers` threads, and each distinct shape is decided once per
+    policy. The window defaults to the last REPLAY_DEFAULT_WINDOW_DAYS days.
+    """
+    started = time.perf_counter()
+    candidate, baseline = compile_policy(candidate), compile_policy(baseline)
+    until = until or datetime.now(timezone.utc).isoformat()
+    since = since or (datetime.now(timezone.utc) - timedelta(days=REPLAY_DEFAULT_WINDOW_DAYS)).isoformat()
+
+    with get_pool(db_path).connection() as conn:
+        low, high = _id_range(conn, since, until)
+
+    shapes = Counter()
+    if low is not None:
+        ranges = _chunks(low, high, max(workers, 1))
+        if len(ranges) == 1:
+            shapes = _count_shapes(db_path, low, high, since, until)
+        else:
+            with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="policy-replay") as pool:
+                for counts in pool.map(lambda r: _count_shapes(db_path, r[0], r[1], since, until), ranges):
+                    shapes.update(counts)
+
+    before, after, transitions = Counter(), Counter(), Counter()
+    newly_denied, newly_masked, newly_filtered, newly_allowed = _bucket(), _bucket(), _bucket(), _bucket()
+    records = distinct = 0
+    for key, count in shapes.items():
+        shape = json.loads(key) if key else None
+        if not shape or shape[0] != 1:
+            continue  # invalid simulations were never governed
+        records += count
+        distinct += 1
+        old_verdict, old_filtered, old_masked = _effect(shape, baseline)
+        new_verdict, new_filtered, new_masked = _effect(shape, candidate)
+        before[old_verdict] += count
+        after[new_verdict] += count
+        if old_verdict != new_verdict:
+            transitions[f"{old_verdict}->{new_verdict}"] += count
+
+        tables = shape[2] or []
+        if new_verdict == "DENY" and old_verdict != "DENY":
+            _add(newly_denied, count, tables, shape[3] or [])
+        elif new_verdict == "ALLOW" and old_verdict != "ALLOW":
+            _add(newly_allowed, count, tables, old_filtered | old_masked)
+        if new_masked - old_masked:
+            _add(newly_masked, count, tables, new_masked - old_masked)
+        if new_filtered - old_filtered:
+            _add(newly_filtered, count, tables, new_filtered - old_filtered)
+
+    return {
+        "window": {"since": since, "until": until},
+        "records": records,
+        "distinct_shapes": distinct,
+        "baseline": {"policy_hash": baseline.policy_hash, "decisions": dict(before)},
+        "candidate": {"policy_hash": candidate.policy_hash, "decisions": dict(after)},
+        "changed": sum(transitions.values()),
+        "transitions": dict(transitions.most_common()),
+        "newly_denied": _finish(newly_denied),
+        "newly_masked": _finish(newly_masked),
+        "newly_filtered": _finish(newly_filtered),
+        "newly_allowed": _finish(newly_allowed),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from agents.policy_compiler import CompiledPolicy, compile_policy
+
+POLICY_HISTORY_SIZE = int(os.getenv("POLICY_HISTORY_SIZE", "50"))
+POLICY_WATCH_INTERVAL = float(os.getenv("POLICY_WATCH_INTERVAL", "1.0"))
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class PolicyVersion:
+    """One activated policy: the dict as given, its compiled form and when it went live"""
+    version: int
+    policy: dict
+    compiled: CompiledPolicy
+    activated_at: str
+    source: str  # "startup", "api", "file", "rollback" or "reset"
+
+    def describe(self) -> dict:
+        return {
+            "version": self.version,
+            "policy_hash": self.compiled.policy_hash,
+            "activated_at": self.activated_at,
+            "source": self.source
+        }
+
+class PolicyStore:
+    """Versioned history of compiled policies with one active snapshot.
+
+    Readers take `store.active` once per request and use that snapshot
+    throughout, so a concurrent activation can never be seen half-applied.
+    Writers build the new snapshot first and publish it with a single
+    reference assignment; only writers take the lock. When `path` is set,
+    activations are written there and a watcher thread picks up edits made
+    to the file directly.
+    """
+
+    def __init__(self, path: str = None, history_size: int = POLICY_HISTORY_SIZE):
+        self.path = os.path.abspath(path) if path else None
+        self.history_size = history_size
+        self._history = deque(maxlen=history_size)
+        self._next_version = 1
+        self._lock = threading.Lock()
+        self._active: Optional[PolicyVersion] = None
+        self._file_signature = None
+        self._watcher = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_policy(cls, policy) -> "PolicyStore":
+        """In-memory store seeded with one policy, not backed by a file"""
+        store = cls()
+        store.activate(policy.to_dict() if isinstance(policy, CompiledPolicy) else policy, source="startup",
+                       persist=False)
+        return store
+
+    @property
+    def active(self) -> Optional[PolicyVersion]:
+        return self._active
+
+    def load(self) -> Optional[PolicyVersion]:
+        """Activate the policy currently in the file, if there is a readable one"""
+        policy = self._read_file()
+        if policy is None:
+            return None
+        return self.activate(policy, source="startup", persist=False)
+
+    def activate(self, policy: dict, source: str = "api", persist: bool = True) -> PolicyVersion:
+        compiled = compile_policy(policy)
+        with self._lock:
+            snapshot = PolicyVersion(
+                version=self._next_version,
+                policy=compiled.to_dict(),
+                compiled=compiled,
+                activated_at=datetime.now(timezone.utc).isoformat(),
+                source=source
+            )
+            self._next_version += 1
+            self._history.append(snapshot)
+            self._active = snapshot
+            if persist:
+                self._write_file(snapshot.policy)
+        return snapshot
+
+    def rollback(self, version: int = None) -> PolicyVersion:
+        """Make an earlier snapshot active again; defaults to the one before the active version"""
+        with self._lock:
+            if version is None:
+                earlier = [v for v in self._history if v.version < self._active.version]
+                if not earlier:
+                    raise KeyError("No earlier policy version to roll back to")
+                target = earlier[-1]
+            else:
+                target = next((v for v in self._history if v.version == version), None)
+                if target is None:
+                    raise KeyError(f"Policy version {version} is not in the history")
+            self._active = target
+            self._write_file(target.policy)
+        return target
+
+    def reset(self) -> PolicyVersion:
+        """Roll back to the oldest snapshot still in the history"""
+        with self._lock:
+            if not self._history:
+                raise KeyError("No policy history to reset to")
+            oldest = self._history[0].version
+        return self.rollback(oldest)
+
+    def versions(self) -> List[PolicyVersion]:
+        return list(self._history)
+
+    def history(self) -> List[Dict]:
+        active = self._active
+        return [dict(v.describe(), active=v is active) for v in list(self._history)]
+
+    def _read_file(self) -> Optional[dict]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            signature = self._signature()
+            with open(self.path, "r") as f:
+                policy = json.load(f)
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable policy file %s", self.path, exc_info=True)
+            return None
+        self._file_signature = signature
+        return policy
+
+    def _write_file(self, policy: dict) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(policy, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._file_signature = self._signature()
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check_file(self) -> Optional[PolicyVersion]:
+        """Activate the file's policy if it changed on disk since we last read or wrote it"""
+        if self._signature() == self._file_signature:
+            return None
+        policy = self._read_file()
+        if policy is None:
+            return None
+        active = self._active
+        if active is not None and compile_policy(policy).policy_hash == active.compiled.policy_hash:
+            return None
+        logger.info("Policy file %s changed; activating it", self.path)
+        return self.activate(policy, source="file", persist=False)
+
+    def start_watcher(self, interval: float = POLICY_WATCH_INTERVAL) -> None:
+        if not self.path or interval <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval):
+                try:
+                    self.check_file()
+                except Exception:
+                    logger.exception("Policy file watcher failed")
+
+        self._watcher = threading.Thread(target=watch, name="policy-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        if self._watcher is not None:
+            self._stop.set()
+            self._watcher.join()
+            self._watcher = None
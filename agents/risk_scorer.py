@@ -0,0 +1,76 @@
+from typing import Any, Dict, Tuple
+from agents.policy_compiler import CompiledPolicy, compile_policy
+from core.episodic_memory import SessionMemory, pii_columns, simulated_rows
+
+# Weights follow the risk guidelines given to the LLM analyst prompt
+PII_BASE = 40
+PII_PER_EXTRA_COLUMN = 5
+PII_MAX = 60
+BLOCKED_BASE = 30
+BLOCKED_PER_EXTRA_COLUMN = 10
+BLOCKED_MAX = 50
+LARGE_RESULT_ROWS = 1000
+LARGE_RESULT_POINTS = 20
+HUGE_RESULT_ROWS = 100000
+HUGE_RESULT_POINTS = 30
+POLICY_VIOLATION_POINTS = 50
+UPDATE_POINTS = 10
+HISTORY_PII_POINTS = 10
+HISTORY_VOLUME_POINTS = 5
+
+def score_risk(simulation: Dict[str, Any], policy, episodic_memory: SessionMemory = None) -> Tuple[int, list]:
+    """Deterministic 0-100 risk score with the reasons that contributed to it.
+
+    History comes from the session's rolling aggregates, so its cost does not
+    depend on the memory window.
+    """
+    compiled: CompiledPolicy = compile_policy(policy)
+    columns = simulation.get("columns_accessed", [])
+    score = 0
+    reasons = []
+
+    pii = pii_columns(simulation)
+    if pii:
+        score += min(PII_MAX, PII_BASE + PII_PER_EXTRA_COLUMN * (len(pii) - 1))
+        reasons.append(f"PII columns accessed: {', '.join(pii)}")
+
+    blocked = sorted(set(columns) & compiled.blocked_columns)
+    if blocked:
+        score += min(BLOCKED_MAX, BLOCKED_BASE + BLOCKED_PER_EXTRA_COLUMN * (len(blocked) - 1))
+        reasons.append(f"Blocked columns accessed: {', '.join(blocked)}")
+
+    rows = simulated_rows(simulation)
+    if rows > HUGE_RESULT_ROWS:
+        score += HUGE_RESULT_POINTS
+        reasons.append(f"Very large dataset: {rows} rows")
+    elif rows > LARGE_RESULT_ROWS:
+        score += LARGE_RESULT_POINTS
+        reasons.append(f"Large dataset: {rows} rows")
+
+    if simulation.get("query_type") == "UPDATE":
+        score += UPDATE_POINTS
+        reasons.append("Query modifies data")
+
+    violations = []
+    if pii and compiled.pii_mode == "deny":
+        violations.append("PII access denied by policy")
+    if compiled.max_rows and rows > compiled.max_rows:
+        violations.append(f"{rows} rows exceeds max_rows {compiled.max_rows}")
+    if violations:
+        score += POLICY_VIOLATION_POINTS
+        reasons.append(f"Policy violation: {'; '.join(violations)}")
+
+    queries = len(episodic_memory) if episodic_memory is not None else 0
+    if queries:
+        pii_queries = episodic_memory.pii_queries
+        if pii_queries * 2 > queries:
+            score += HISTORY_PII_POINTS
+            reasons.append(f"{pii_queries} of the last {queries} queries touched PII")
+        if episodic_memory.row_volume > HUGE_RESULT_ROWS:
+            score += HISTORY_VOLUME_POINTS
+            reasons.append("High recent data volume")
+
+    if not reasons:
+        reasons.append("Low risk query - no risk factors detected")
+
+    return max(0, min(100, score)), reasons
@@ -1,5 +1,6 @@
-from typing import List, Dict
+from typing import Iterable, List, Dict, Tuple
 from pydantic import BaseModel, Field
+from agents.column_classifier import get_classification_index
 
 class SQLPlan(BaseModel):
     intent: str = Field(description="User's intent or goal")
@@ -9,11 +10,14 @@ class SQLPlan(BaseModel):
 class PolicyConfig(BaseModel):
     max_rows: int | None = Field(default=None, description="Maximum rows allowed")
     deny_pii: bool = Field(default=False, description="Deny access to PII data")
+    mask_pii: bool = Field(default=False, description="Mask PII data instead of denying it")
     blocked_columns: List[str] = Field(default_factory=list, description="List of blocked column names")
     allowed_tables: List[str] = Field(default_factory=list, description="List of allowed table names")
 
-PII_KEYWORDS = ['name', 'email', 'phone', 'address', 'ssn', 'id']
-
-def classify_columns(columns: List[str]) -> Dict[str, str]:
+def classify_columns(columns: List[str], tables: Iterable[str] = None) -> Dict[str, str]:
     """Classify columns for PII detection"""
-    return {col: 'PII' if any(k in col.lower() for k in PII_KEYWORDS) else 'PUBLIC' for col in columns}
\ No newline at end of file
+    return get_classification_index().classify_columns(columns, tables)
+
+def classify_reads(reads: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+    """Classify the (table, column) pairs a statement reads"""
+    return get_classification_index().classify_reads(reads)
\ No newline at end of file
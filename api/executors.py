@@ -0,0 +1,110 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DB_WORKERS = int(os.getenv("DB_WORKERS", "8"))
+DB_QUEUE = int(os.getenv("DB_QUEUE", "64"))
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "4"))
+LLM_QUEUE = int(os.getenv("LLM_QUEUE", "16"))
+# Open streamed responses; keep it below SQLITE_POOL_SIZE so streams cannot starve other requests
+STREAM_LIMIT = int(os.getenv("STREAM_LIMIT", "4"))
+
+class Overloaded(Exception):
+    """Raised when an executor's queue is full; the API answers 429"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} executor is saturated")
+        self.name = name
+        self.retry_after = retry_after
+
+class BoundedExecutor:
+    """Thread pool for one class of blocking work with a hard cap on queued calls.
+
+    At most `max_workers` calls run and `max_queue` more wait; anything beyond
+    that is shed immediately with Overloaded instead of queueing without bound.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, retry_after: int = 1):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._in_flight = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    async def run(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise Overloaded(self.name, self.retry_after)
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        # Released when the worker finishes, not when the caller stops waiting:
+        # a cancelled request leaves its thread running and its slot taken
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queue_capacity": self.max_queue,
+                "in_flight": self._in_flight,
+                "rejected": self._rejected
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+class StreamSlots:
+    """Cap on concurrently open streamed responses.
+
+    A stream keeps its pooled connection until the client has read the last
+    row, long after its executor slot is released, so open streams are counted
+    on their own and shed with Overloaded once `limit` are open.
+    """
+
+    def __init__(self, name: str, limit: int, retry_after: int = 1):
+        self.name = name
+        self.limit = limit
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(limit)
+        self._open = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise Overloaded(self.name, self.retry_after)
+        with self._lock:
+            self._open += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._open -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"limit": self.limit, "open": self._open, "rejected": self._rejected}
+
+db_executor = BoundedExecutor("db", DB_WORKERS, DB_QUEUE, retry_after=1)
+llm_executor = BoundedExecutor("llm", LLM_WORKERS, LLM_QUEUE, retry_after=5)
+stream_slots = StreamSlots("stream", STREAM_LIMIT, retry_after=1)
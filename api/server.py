@@ -1,36 +1,53 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-import sqlite3
+from typing import List, Optional
 import json
 import os
-from core.sandbox.sandbox_manager import SandboxManager
+from core.sandbox.sandbox_manager import SandboxManager, DEFAULT_SIMULATION_MODE
+from core.sandbox.simulation_cache import simulation_cache, version_snapshot
 from execution.execution_kernel import ExecutionKernel
-from core.audit_logger import log_audit, init_db, DB_PATH
+from core.audit_logger import log_audit, init_db, query_audit_logs, shutdown_audit_writer
+from core.connection_pool import close_all_pools
+from core.episodic_memory import DEFAULT_SESSION
 from agents.policy_interpreter_agent import PolicyInterpreterAgent
+from agents.policy_compiler import mark_blocked_columns
+from agents.policy_replay import replay_policy
+from agents.policy_store import PolicyStore
+from agents.column_classifier import configure_classification_index, get_classification_index
+from agentic.governance_orchestrator import get_risk_enrichment
+from api.executors import Overloaded, db_executor, llm_executor, stream_slots
 
 ACTIVE_POLICY_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "policies", "active_policy.json")
 
-def load_persisted_policy():
-    if os.path.exists(ACTIVE_POLICY_FILE):
-        try:
-            with open(ACTIVE_POLICY_FILE, "r") as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return None
-
-def save_policy_to_file(policy: dict):
-    os.makedirs(os.path.dirname(ACTIVE_POLICY_FILE), exist_ok=True)
-    with open(ACTIVE_POLICY_FILE, "w") as f:
-        json.dump(policy, f, indent=2)
-
 init_db()
 
 app = FastAPI(title="Governed AI Execution Engine")
 
+@app.on_event("startup")
+def startup():
+    policy_store.start_watcher()
+
+@app.on_event("shutdown")
+def shutdown():
+    policy_store.stop_watcher()
+    llm_executor.shutdown()
+    db_executor.shutdown()
+    shutdown_audit_writer()
+    close_all_pools()
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=429,
+        content={"status": "error", "error": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 from agents.nl_interface_agent import NaturalLanguageAgent
 
 nl_agent = NaturalLanguageAgent()
+policy_agent = PolicyInterpreterAgent()
 
 SCHEMA = {
     "accounts": {
@@ -73,11 +90,11 @@ SCHEMA = {
     }
 }
 
-ACTIVE_POLICY = load_persisted_policy()
-if ACTIVE_POLICY is None:
-    raise RuntimeError("No active policy found. Please configure a policy using /policy/activate endpoint.")
+policy_store = PolicyStore(ACTIVE_POLICY_FILE)
+if policy_store.load() is None:
+    raise RuntimeError(f"No active policy found. Please provide one in {ACTIVE_POLICY_FILE}.")
 
-kernel = ExecutionKernel(ACTIVE_POLICY)
+kernel = ExecutionKernel(policy_store)
 
 class NLRequest(BaseModel):
     user_input: str
@@ -90,6 +107,12 @@ class ExecuteRequest(BaseModel):
     simulation: dict
     user_input: str
     human_free: bool = False
+    session_id: str = DEFAULT_SESSION
+
+class ExecuteBatchRequest(BaseModel):
+    statements: List[str]
+    user_input: str = ""
+    session_id: str = DEFAULT_SESSION
 
 class PolicyNLRequest(BaseModel):
     policy_text: str
@@ -97,148 +120,298 @@ class PolicyNLRequest(BaseModel):
 class WhatIfRequest(BaseModel):
     policy: dict
     sql: str
+    explain: bool = False
+
+class ReplayRequest(BaseModel):
+    policy: dict
+    since: Optional[str] = None
+    until: Optional[str] = None
+    baseline_version: Optional[int] = None
 
 def build_schema_hint(schema: dict) -> str:
     return ", ".join(f"{table}({', '.join(columns.keys())})" for table, columns in schema.items())
 
+SCHEMA_HINT = build_schema_hint(SCHEMA)
+
+# Classifications are precomputed per table.column; cached simulations embed them
+configure_classification_index(schema=SCHEMA)
+get_classification_index().subscribe(simulation_cache.clear)
+
+def _mark_blocked_columns(simulation: dict) -> dict:
+    # Marks a copy: cached simulations stay policy-independent
+    return mark_blocked_columns(simulation, policy_store.active.compiled)
+
+def simulate_many(sqls: list) -> list:
+    """Simulate several statements, sharing one sandbox for cache misses"""
+    simulations, sandbox = [], None
+    try:
+        for sql in sqls:
+            simulation = simulation_cache.get(sql, DEFAULT_SIMULATION_MODE)
+            if simulation is None:
+                sandbox = sandbox or SandboxManager(SCHEMA)
+                versions = version_snapshot()
+                simulation = sandbox.simulate_query(sql)
+                simulation_cache.put(sql, simulation, sandbox.mode, versions)
+            simulations.append(_mark_blocked_columns(simulation))
+    finally:
+        if sandbox is not None:
+            sandbox.teardown()
+    return simulations
+
+def _simulate(sql: str) -> dict:
+    simulation = simulation_cache.get(sql, DEFAULT_SIMULATION_MODE)
+    if simulation is None:
+        sandbox = SandboxManager(SCHEMA)
+        versions = version_snapshot()
+        simulation = sandbox.simulate_query(sql)
+        sandbox.teardown()
+        simulation_cache.put(sql, simulation, sandbox.mode, versions)
+    return simulation
+
 def run_simulation(sql: str, user_input: str = "") -> dict:
-    sandbox = SandboxManager(SCHEMA)
-    simulation = sandbox.simulate_query(sql)
-    sandbox.teardown()
-    
-    blocked_cols = set(ACTIVE_POLICY.get("blocked_columns", []))
-    for col in simulation.get("columns_accessed", []):
-        if col in blocked_cols:
-            simulation["column_classification"][col] = "BLOCKED"
-    
-    pii_detected = "PII" in simulation.get("column_classification", {}).values()
+    simulation = _mark_blocked_columns(_simulate(sql))
+
+    pii_detected = "PII" in simulation.get("column_classification", {}).values() \
+        or "PII" in simulation.get("source_classification", {}).values()
     if pii_detected:
         log_audit(user_input=user_input, sql=sql, decision="DENIED", 
-                 reason="PII detected - blocked at UI level", simulation=simulation)
+                 reason="PII detected - blocked at UI level", simulation=simulation,
+                 policy_version=policy_store.active.version, source="simulation")
     return simulation
 
 def _get_nl_plan(user_input: str, human_free: bool = False):
-    schema_hint = build_schema_hint(SCHEMA)
-    plan = nl_agent.interpret(user_input=user_input, schema_hint=schema_hint)
+    plan = nl_agent.interpret(user_input=user_input, schema_hint=SCHEMA_HINT)
     sql = plan.get("sql")
     if not sql:
         return None, {"status": "error", "reason": "No SQL generated by LLM", "plan": plan}
     return sql, plan
 
 @app.post("/nl_to_sql")
-def nl_to_sql(req: NLRequest):
-    sql, plan = _get_nl_plan(req.user_input)
+async def nl_to_sql(req: NLRequest):
+    sql, plan = await llm_executor.run(_get_nl_plan, req.user_input)
     if not sql:
         return plan
     return {"status": "ok", "plan": plan}
 
 @app.post("/nl_simulate")
-def nl_simulate(req: NLRequest):
-    sql, plan = _get_nl_plan(req.user_input, req.human_free if hasattr(req, 'human_free') else False)
+async def nl_simulate(req: NLRequest):
+    sql, plan = await llm_executor.run(_get_nl_plan, req.user_input, req.human_free if hasattr(req, 'human_free') else False)
     if not sql:
         return plan
-    simulation = run_simulation(sql, req.user_input)
+    simulation = await db_executor.run(run_simulation, sql, req.user_input)
     return {"status": "ok", "plan": plan, "simulation": simulation}
 
 @app.post("/simulate")
-def simulate(req: SimulateRequest):
-    return {"simulation": run_simulation(req.sql)}
+async def simulate(req: SimulateRequest):
+    return {"simulation": await db_executor.run(run_simulation, req.sql)}
+
+def _execute_governed(req: ExecuteRequest) -> dict:
+    result = kernel.run_sql(req.sql, req.simulation, req.session_id)
+
+    status = result.get("status", "UNKNOWN")
+    decision = "DENIED" if status == "DENIED" else "ALLOWED"
+    reason = result.get("reason", "")
+
+    if "governance" in result:
+        governance = result["governance"]
+        if "decision" in governance:
+            gov_decision = governance["decision"].get("decision", "")
+            if gov_decision == "DENY":
+                decision = "DENIED"
+            elif gov_decision:
+                decision = gov_decision
+            reason = governance["decision"].get("explanation", reason)
+    elif status == "DENIED" and "reason" in result:
+        reason = result["reason"]
+
+    log_audit(
+        user_input=req.user_input,
+        sql=req.sql,
+        decision=decision,
+        reason=reason,
+        simulation=req.simulation,
+        policy_version=result.get("policy_version"),
+        source="api"
+    )
+
+    return result
 
 @app.post("/execute")
-def execute(req: ExecuteRequest):
+async def execute(req: ExecuteRequest):
     try:
-        result = kernel.run_sql(req.sql, req.simulation)
-
-        status = result.get("status", "UNKNOWN")
-        decision = "DENIED" if status == "DENIED" else "ALLOWED"
-        reason = result.get("reason", "")
-
-        if "governance" in result:
-            governance = result["governance"]
-            if "decision" in governance:
-                gov_decision = governance["decision"].get("decision", "")
-                if gov_decision == "DENY":
-                    decision = "DENIED"
-                elif gov_decision:
-                    decision = gov_decision
-                reason = governance["decision"].get("explanation", reason)
-        elif status == "DENIED" and "reason" in result:
-            reason = result["reason"]
-
-        log_audit(
-            user_input=req.user_input,
-            sql=req.sql,
-            decision=decision,
-            reason=reason,
-            simulation=req.simulation
+        return await db_executor.run(_execute_governed, req)
+    except Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=str(e)
         )
 
-        return result
+@app.post("/execute_batch")
+async def execute_batch(req: ExecuteBatchRequest):
+    """Simulate, govern and execute related statements as one unit"""
+    def run():
+        simulations = simulate_many(req.statements)
+        return kernel.run_batch(list(zip(req.statements, simulations)), user_input=req.user_input,
+                                session_id=req.session_id)
+    return await db_executor.run(run)
+
+@app.post("/execute/stream")
+async def execute_stream(req: ExecuteRequest):
+    """Governed SELECT streamed as NDJSON: an envelope line, one JSON array per
+    row, then a summary line"""
+    # Held until the response finishes: the stream keeps a pooled connection that long
+    stream_slots.acquire()
+    try:
+        envelope, batches = await db_executor.run(kernel.run_sql_stream, req.sql, req.simulation, req.user_input,
+                                                  req.session_id)
+    except Overloaded:
+        stream_slots.release()
+        raise
     except Exception as e:
+        stream_slots.release()
         raise HTTPException(
-            status_code= 500,
-            details = str(e)
+            status_code=500,
+            detail=str(e)
         )
+    except BaseException:
+        stream_slots.release()
+        raise
+
+    def ndjson():
+        try:
+            yield json.dumps(envelope, default=str) + "\n"
+            if batches is None:
+                return
+            streamed = 0
+            try:
+                for rows in batches:
+                    streamed += len(rows)
+                    yield "".join(json.dumps(row, default=str) + "\n" for row in rows)
+            except Exception as e:
+                yield json.dumps({"status": "error", "error": str(e), "rows_streamed": streamed}) + "\n"
+                return
+            finally:
+                batches.close()
+            yield json.dumps({"status": "complete", "rows_streamed": streamed}) + "\n"
+        finally:
+            stream_slots.release()
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 @app.get("/episodic_memory")
-def get_episodic_memory():
-    """Get the episodic memory of recent simulations"""
-    return {"episodic_memory": kernel.episodic_memory}
+def get_episodic_memory(session_id: str = DEFAULT_SESSION):
+    """Get one session's recent simulations and their rolling aggregates"""
+    view = kernel.episodic_memory.view(session_id)
+    return {"session_id": session_id, "episodic_memory": view["entries"], "aggregates": view["aggregates"]}
+
+@app.get("/episodic_memory/sessions")
+def get_episodic_sessions():
+    """Rolling aggregates for every session held in memory"""
+    return {"sessions": kernel.episodic_memory.sessions()}
+
+@app.get("/risk/enrichment/{enrichment_id}")
+def risk_enrichment(enrichment_id: str):
+    """LLM second opinion on a risk score, when RISK_LLM_ENRICHMENT is enabled"""
+    result = get_risk_enrichment(enrichment_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown enrichment id")
+    return result
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    return {"simulation": simulation_cache.stats(), "nl_plan": nl_agent.plan_cache.stats(),
+            "classification": get_classification_index().stats()}
+
+@app.get("/executors/stats")
+def get_executor_stats():
+    return {"db": db_executor.stats(), "llm": llm_executor.stats(), "stream": stream_slots.stats()}
 
 @app.get("/audit_logs")
-def get_audit_logs(limit: int = 50):
+def get_audit_logs(limit: int = 50, cursor: int = None, decision: str = None, since: str = None,
+                   until: str = None, table: str = None, include_simulation: bool = False,
+                   policy_version: int = None, source: str = None):
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT timestamp, user_input, sql, decision, reason, simulation FROM audit_logs ORDER BY id DESC LIMIT ?", (limit,))
-        logs = []
-        for row in cursor.fetchall():
-            try:
-                simulation = json.loads(row[5] or "{}")
-            except:
-                simulation = {}
-            logs.append({"timestamp": row[0] or "", "user_input": row[1] or "", "sql": row[2] or "",
-                        "decision": row[3] or "", "reason": row[4] or "", "simulation": simulation})
-        conn.close()
-        return logs
+        return query_audit_logs(limit=min(max(limit, 1), 1000), cursor=cursor, decision=decision, since=since,
+                                until=until, table=table, include_simulation=include_simulation,
+                                policy_version=policy_version, source=source)
     except:
-        return []
+        return {"logs": [], "next_cursor": None}
 
 @app.post("/policy/interpreter")
-def interpret_policy(req: PolicyNLRequest):
+async def interpret_policy(req: PolicyNLRequest):
     try:
-        policy = PolicyInterpreterAgent().interpret(req.policy_text)
+        policy = await llm_executor.run(policy_agent.interpret, req.policy_text)
         return {"status": "ok", "policy": policy}
+    except Overloaded:
+        raise
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
 @app.post("/policy/activate")
 def activate_policy(policy: dict):
-    global ACTIVE_POLICY
-    ACTIVE_POLICY = policy
-    kernel.policy = ACTIVE_POLICY
-    save_policy_to_file(ACTIVE_POLICY)
-    return {"status": "activated", "policy": ACTIVE_POLICY}
+    try:
+        active = policy_store.activate(policy)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "activated", "policy": active.policy, "version": active.version}
+
+@app.post("/policy/rollback")
+def rollback_policy(version: int = None):
+    try:
+        active = policy_store.rollback(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return {"status": "rolled_back", "policy": active.policy, "version": active.version}
 
 @app.post("/policy/reset")
 def reset_policy():
-    if os.path.exists(ACTIVE_POLICY_FILE):
-        os.remove(ACTIVE_POLICY_FILE)
-        return {"status": "reset", "message": "Policy file removed. Server restart required with new policy."}
-    else:
-        return {"status": "error", "message": "No policy file found to reset."}
+    active = policy_store.reset()
+    return {"status": "reset", "policy": active.policy, "version": active.version}
 
 @app.get("/policy/current")
 def get_current_policy():
-    return {"policy": ACTIVE_POLICY}
+    active = policy_store.active
+    return {"policy": active.policy, "version": active.version, "activated_at": active.activated_at}
+
+@app.get("/policy/history")
+def get_policy_history():
+    return {"versions": policy_store.history()}
+
+@app.post("/policy/replay")
+async def replay(req: ReplayRequest):
+    """Aggregate effect of a candidate policy on audited traffic, compared with the active (or a given) version"""
+    baseline = policy_store.active
+    if req.baseline_version is not None:
+        baseline = next((v for v in policy_store.versions() if v.version == req.baseline_version), None)
+        if baseline is None:
+            raise HTTPException(status_code=404, detail=f"Policy version {req.baseline_version} is not in the history")
+    try:
+        result = await db_executor.run(replay_policy, req.policy, since=req.since, until=req.until,
+                                       baseline=baseline.compiled)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return dict(result, baseline_version=baseline.version)
+
+def _dry_run(sql: str, policy: dict):
+    simulation = _simulate(sql)
+    return simulation, kernel.dry_run(sql, simulation, policy)
 
 @app.post("/policy/what_if")
-def what_if(req: WhatIfRequest):
-    simulation = run_simulation(req.sql)
-    temp_kernel = ExecutionKernel(req.policy)
-    decision = temp_kernel.run_sql(req.sql, simulation)
-    llm_explanation = PolicyInterpreterAgent().explain_effect(policy=req.policy, simulation=simulation, decision=decision)
-    return {"simulation": simulation, "decision_under_policy": decision["status"], "lm_explanation": llm_explanation}
+async def what_if(req: WhatIfRequest):
+    """Dry run of one statement under a candidate policy: no execution, no audit rows.
+    The LLM explanation is only produced when asked for with `explain`."""
+    try:
+        simulation, result = await db_executor.run(_dry_run, req.sql, req.policy)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response = {"simulation": simulation, "decision_under_policy": result["status"], "dry_run": result}
+    if req.explain:
+        response["llm_explanation"] = await llm_executor.run(
+            policy_agent.explain_effect, policy=req.policy, simulation=simulation, decision=result
+        )
+    return response
 
 @app.get("/")
 def root():
@@ -0,0 +1,121 @@
+"""Deterministic synthetic finance data for the accounts/vendors/transactions/budgets schema.
+
+Rows are generated inside SQLite from a recursive sequence and an integer hash
+of (row id, column salt, seed), so the same `transactions` count and seed give
+byte-identical tables on every machine and Python version.
+
+    python -m benchmarks.datagen --rows 1000000 --output /tmp/app_1m.db
+"""
+import argparse
+import os
+import sqlite3
+import time
+from typing import Dict, Sequence
+
+SCHEMA_SQL = (
+    "CREATE TABLE accounts(id INTEGER PRIMARY KEY, account_name TEXT, account_type TEXT, currency TEXT, "
+    "balance REAL, risk_level TEXT, created_at TEXT)",
+    "CREATE TABLE vendors(id INTEGER PRIMARY KEY, vendor_name TEXT, country TEXT, is_blocked INTEGER, "
+    "risk_score INTEGER, created_at TEXT)",
+    "CREATE TABLE transactions(id INTEGER PRIMARY KEY, account_id INTEGER, vendor_id INTEGER, amount REAL, "
+    "currency TEXT, transaction_type TEXT, category TEXT, transaction_date TEXT, approved_by TEXT)",
+    "CREATE TABLE budgets(id INTEGER PRIMARY KEY, department TEXT, category TEXT, monthly_limit REAL, "
+    "fiscal_year INTEGER)",
+)
+
+ACCOUNT_TYPES = ("checking", "savings", "credit", "payroll", "escrow")
+CURRENCIES = ("USD", "EUR", "GBP", "JPY", "CHF")
+RISK_LEVELS = ("low", "low", "low", "medium", "medium", "high")
+COUNTRIES = ("US", "DE", "GB", "FR", "JP", "IN", "BR", "CA", "SG", "NL")
+TRANSACTION_TYPES = ("debit", "credit", "refund", "transfer")
+CATEGORIES = ("travel", "software", "hardware", "consulting", "marketing", "office", "payroll", "legal")
+DEPARTMENTS = ("finance", "engineering", "sales", "marketing", "operations")
+APPROVERS = ("alice", "bob", "carol", "dave", "erin", "frank", None)
+
+def _hash(column: str, salt: int, seed: int) -> str:
+    """SQL expression: a pseudo-random non-negative integer per row, stable for (row, salt, seed).
+    Each salt gets its own multiplier so columns are not shifted copies of each other."""
+    multiplier = 2654435761 + 2 * 40503 * salt
+    return f"((({column} + {seed * 7919}) * {multiplier}) % 4294967291)"
+
+def _pick(values: Sequence, column: str, salt: int, seed: int) -> str:
+    cases = " ".join(
+        f"WHEN {i} THEN {'NULL' if value is None else repr(value)}" for i, value in enumerate(values)
+    )
+    return f"(CASE {_hash(column, salt, seed)} % {len(values)} {cases} END)"
+
+def _sequence(count: int) -> str:
+    return f"WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {count})"
+
+def table_sizes(rows: int) -> Dict[str, int]:
+    """Row count per table for a given number of transactions"""
+    return {
+        "accounts": max(10, rows // 200),
+        "vendors": max(5, rows // 400),
+        "transactions": rows,
+        "budgets": len(DEPARTMENTS) * len(CATEGORIES),
+    }
+
+def generate(path: str, rows: int, seed: int = 0) -> Dict[str, int]:
+    """Create a fresh database at `path` with `rows` transactions; returns the table sizes"""
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    sizes = table_sizes(rows)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    for ddl in SCHEMA_SQL:
+        conn.execute(ddl)
+
+    conn.execute(f"""
+        {_sequence(sizes['accounts'])}
+        INSERT INTO accounts
+        SELECT n, 'Account ' || n, {_pick(ACCOUNT_TYPES, 'n', 1, seed)}, {_pick(CURRENCIES, 'n', 2, seed)},
+               round(({_hash('n', 3, seed)} % 10000000) / 100.0, 2), {_pick(RISK_LEVELS, 'n', 4, seed)},
+               date('2020-01-01', '+' || ({_hash('n', 5, seed)} % 1461) || ' days')
+        FROM seq
+    """)
+    conn.execute(f"""
+        {_sequence(sizes['vendors'])}
+        INSERT INTO vendors
+        SELECT n, 'Vendor ' || n, {_pick(COUNTRIES, 'n', 11, seed)}, ({_hash('n', 12, seed)} % 20 = 0),
+               {_hash('n', 13, seed)} % 101,
+               date('2020-01-01', '+' || ({_hash('n', 14, seed)} % 1461) || ' days')
+        FROM seq
+    """)
+    conn.execute(f"""
+        {_sequence(sizes['transactions'])}
+        INSERT INTO transactions
+        SELECT n, 1 + {_hash('n', 21, seed)} % {sizes['accounts']}, 1 + {_hash('n', 22, seed)} % {sizes['vendors']},
+               round(({_hash('n', 23, seed)} % 5000000) / 100.0, 2), {_pick(CURRENCIES, 'n', 24, seed)},
+               {_pick(TRANSACTION_TYPES, 'n', 25, seed)}, {_pick(CATEGORIES, 'n', 26, seed)},
+               date('2023-01-01', '+' || ({_hash('n', 27, seed)} % 730) || ' days'),
+               {_pick(APPROVERS, 'n', 28, seed)}
+        FROM seq
+    """)
+    budgets = [
+        (i + 1, department, category, float(1000 * (1 + (i * 7 + seed) % 50)), 2024)
+        for i, (department, category) in enumerate(
+            (department, category) for department in DEPARTMENTS for category in CATEGORIES
+        )
+    ]
+    conn.executemany("INSERT INTO budgets VALUES (?, ?, ?, ?, ?)", budgets)
+    conn.commit()
+    conn.close()
+    return sizes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="number of transactions (10k to 10M)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True, help="database file to (re)create")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    sizes = generate(args.output, args.rows, args.seed)
+    print(f"Generated {sizes} in {time.perf_counter() - started:.1f}s -> {args.output}")
+
+if __name__ == "__main__":
+    main()
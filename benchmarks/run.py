@@ -0,0 +1,258 @@
+"""Stage-level benchmarks for the governed execution pipeline.
+
+Each stage is timed on its own against a generated database (see
+benchmarks/datagen.py), one subprocess per scale so pools, caches and module
+level paths start clean. Results are written as JSON; pass an earlier result
+file to --compare to print per-stage changes.
+
+    python -m benchmarks.run --rows 10000 100000 1000000 --output bench.json
+    python -m benchmarks.run --rows 10000 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_FORMAT = 1
+
+SIMULATED_QUERIES = (
+    "SELECT id, amount, currency FROM transactions WHERE amount > 40000",
+    "SELECT t.id, t.amount, v.vendor_name FROM transactions t JOIN vendors v ON t.vendor_id = v.id "
+    "WHERE v.country = 'DE'",
+    "SELECT category, SUM(amount) AS total FROM transactions GROUP BY category",
+    "SELECT account_name, balance FROM accounts WHERE risk_level = 'high'",
+    "UPDATE budgets SET monthly_limit = monthly_limit WHERE department = 'finance'",
+)
+
+EXECUTED_QUERIES = (
+    "SELECT id, amount, currency FROM transactions WHERE amount > 40000 LIMIT 100",
+    "SELECT category, SUM(amount) AS total FROM transactions GROUP BY category",
+    "SELECT account_name, balance FROM accounts WHERE risk_level = 'high' LIMIT 100",
+    "SELECT t.id, t.amount, v.vendor_name FROM transactions t JOIN vendors v ON t.vendor_id = v.id LIMIT 100",
+)
+
+BENCHMARK_POLICY = {"blocked_columns": ["vendor_name"], "deny_pii": False, "max_rows": 1000, "allowed_tables": []}
+
+def measure(fn: Callable[[int], object], iterations: int, max_seconds: float, warmup: int = 3) -> Dict:
+    """Time `fn(i)` per call; stops early once `max_seconds` is spent (after at least 3 calls)"""
+    for i in range(min(warmup, iterations)):
+        fn(i)
+    samples = []
+    deadline = time.perf_counter() + max_seconds
+    for i in range(iterations):
+        started = time.perf_counter_ns()
+        fn(i)
+        samples.append((time.perf_counter_ns() - started) / 1000)
+        if len(samples) >= 3 and time.perf_counter() > deadline:
+            break
+    samples.sort()
+
+    def pct(p: float) -> float:
+        return round(samples[min(len(samples) - 1, int(p * len(samples)))], 2)
+
+    mean = statistics.fmean(samples)
+    return {
+        "iterations": len(samples),
+        "mean_us": round(mean, 2),
+        "p50_us": pct(0.50),
+        "p95_us": pct(0.95),
+        "p99_us": pct(0.99),
+        "min_us": round(samples[0], 2),
+        "max_us": round(samples[-1], 2),
+        "ops_per_s": round(1e6 / mean, 1) if mean else None,
+    }
+
+def run_stages(rows: int, iterations: int, max_seconds: float, audit_rows: int) -> Dict:
+    """Runs inside the worker process, after APP_DB_PATH/AUDIT_DB_PATH point at the benchmark files"""
+    from fastapi.testclient import TestClient
+    from agentic.governance_orchestrator import GovernanceOrchestrator
+    from agents.governance_agents import GovernanceDecisionAgent
+    from agents.policy_compiler import compile_policy, mark_blocked_columns
+    from agents.tools import classify_columns
+    from api.server import SCHEMA, app
+    from core.audit_logger import get_audit_writer, log_audit, log_audit_many
+    from core.sandbox.sandbox_manager import SandboxManager, execute_query
+
+    compiled = compile_policy(BENCHMARK_POLICY)
+    stages = {}
+
+    sandbox = SandboxManager(SCHEMA)
+    try:
+        stages["simulate_query"] = measure(
+            lambda i: sandbox.simulate_query(SIMULATED_QUERIES[i % len(SIMULATED_QUERIES)]), iterations, max_seconds
+        )
+        simulations = [mark_blocked_columns(sandbox.simulate_query(sql), compiled) for sql in SIMULATED_QUERIES]
+    finally:
+        sandbox.teardown()
+
+    stages["classify_columns"] = measure(
+        lambda i: classify_columns(simulations[i % len(simulations)]["columns_accessed"],
+                                   simulations[i % len(simulations)]["tables_accessed"]),
+        iterations * 10, max_seconds
+    )
+
+    memoized, uncached = GovernanceDecisionAgent(), GovernanceDecisionAgent(memo_size=0)
+    stages["decide"] = measure(
+        lambda i: memoized.decide(simulations[i % len(simulations)], compiled), iterations * 10, max_seconds
+    )
+    stages["decide_uncached"] = measure(
+        lambda i: uncached.decide(simulations[i % len(simulations)], compiled), iterations * 10, max_seconds
+    )
+
+    # The graph path routes to the LLM enrichment node, answered by the stub backend
+    graph, direct = GovernanceOrchestrator(fast_path=False), GovernanceOrchestrator(fast_path=True)
+    stages["orchestrator_run_graph"] = measure(
+        lambda i: graph.run(simulations[i % len(simulations)], BENCHMARK_POLICY, compiled_policy=compiled),
+        iterations, max_seconds
+    )
+    stages["orchestrator_run_direct"] = measure(
+        lambda i: direct.run(simulations[i % len(simulations)], BENCHMARK_POLICY, compiled_policy=compiled,
+                             enrich=False),
+        iterations * 10, max_seconds
+    )
+
+    stages["execute_query"] = measure(
+        lambda i: execute_query(EXECUTED_QUERIES[i % len(EXECUTED_QUERIES)]), iterations, max_seconds
+    )
+
+    writer = get_audit_writer()
+    stages["log_audit"] = measure(
+        lambda i: log_audit(user_input="benchmark", sql=SIMULATED_QUERIES[i % len(SIMULATED_QUERIES)],
+                            decision="ALLOW", reason="benchmark", simulation=simulations[i % len(simulations)],
+                            policy_version=1),
+        iterations * 10, max_seconds
+    )
+    started = time.perf_counter()
+    writer.flush()
+    stages["log_audit_flush"] = {"mean_us": round((time.perf_counter() - started) * 1e6, 2), "iterations": 1}
+
+    for start in range(0, audit_rows, 1000):
+        log_audit_many([
+            {"user_input": "seed", "sql": SIMULATED_QUERIES[j % len(SIMULATED_QUERIES)],
+             "decision": ("ALLOW", "DENIED", "ALLOW_WITH_FILTERING")[j % 3], "reason": "seed",
+             "simulation": simulations[j % len(simulations)], "policy_version": 1}
+            for j in range(start, min(start + 1000, audit_rows))
+        ])
+    writer.flush()
+
+    client = TestClient(app)
+    for name, params in (
+        ("audit_logs", {"limit": 50}),
+        ("audit_logs_by_table", {"limit": 50, "table": "vendors"}),
+        ("audit_logs_by_decision", {"limit": 50, "decision": "DENIED"}),
+        ("audit_logs_with_simulation", {"limit": 50, "include_simulation": True}),
+    ):
+        stages[name] = measure(lambda i: client.get("/audit_logs", params=params).raise_for_status(),
+                               iterations, max_seconds)
+    return stages
+
+def _worker(args) -> None:
+    result = run_stages(args.rows, args.iterations, args.max_seconds, args.audit_rows)
+    with open(args.worker_output, "w") as f:
+        json.dump(result, f)
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_scale(rows: int, args) -> Dict:
+    from benchmarks.datagen import generate, table_sizes
+
+    app_db = os.path.join(args.data_dir, f"app_{rows}_seed{args.seed}.db")
+    generate_s = None
+    if not os.path.exists(app_db):
+        started = time.perf_counter()
+        generate(app_db, rows, args.seed)
+        generate_s = round(time.perf_counter() - started, 2)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        output = os.path.join(scratch, "stages.json")
+        env = dict(os.environ, APP_DB_PATH=app_db, AUDIT_DB_PATH=os.path.join(scratch, "audit.db"),
+                   LLM_BACKEND="stub", RISK_LLM_ENRICHMENT="1", PYTHONPATH=ROOT)
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", "--worker", "--rows", str(rows),
+             "--iterations", str(args.iterations), "--max-seconds", str(args.max_seconds),
+             "--audit-rows", str(args.audit_rows), "--worker-output", output],
+            cwd=ROOT, env=env, check=True
+        )
+        with open(output) as f:
+            stages = json.load(f)
+    return {"rows": rows, "tables": table_sizes(rows), "generate_s": generate_s, "stages": stages}
+
+def compare(previous: Dict, current: Dict, threshold: float) -> List[str]:
+    """One line per stage present in both runs; slowdowns beyond `threshold` are flagged"""
+    lines = []
+    before = {scale["rows"]: scale["stages"] for scale in previous.get("scales", [])}
+    for scale in current["scales"]:
+        for stage, stats in scale["stages"].items():
+            old = before.get(scale["rows"], {}).get(stage)
+            if not old or not old.get("mean_us"):
+                continue
+            ratio = stats["mean_us"] / old["mean_us"]
+            flag = "REGRESSION" if ratio > 1 + threshold else ("faster" if ratio < 1 - threshold else "")
+            lines.append(f"{scale['rows']:>10} {stage:<28} {old['mean_us']:>12.1f}us -> "
+                         f"{stats['mean_us']:>12.1f}us  x{ratio:.2f} {flag}".rstrip())
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000],
+                        help="transaction counts to benchmark (10k to 10M)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=200, help="calls per stage (cheap stages run 10x)")
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="time budget per stage")
+    parser.add_argument("--audit-rows", type=int, default=100000, help="audit records seeded before /audit_logs")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "governance-benchmarks"),
+                        help="where generated databases are kept and reused")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change reported by --compare")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args)
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    result = {
+        "format": RESULT_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "max_seconds": args.max_seconds,
+            "audit_rows": args.audit_rows,
+            "simulation_mode": os.getenv("SIMULATION_MODE", "plan"),
+            "policy": BENCHMARK_POLICY,
+        },
+        "scales": [run_scale(rows, args) for rows in args.rows],
+    }
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(json.load(f), result, args.threshold)))
+
+if __name__ == "__main__":
+    main()
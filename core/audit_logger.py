@@ -1,42 +1,376 @@
-import sqlite3
+import atexit
 import json
+import logging
 import os
+import queue
+import sqlite3
+import threading
+import time
 from datetime import datetime, timezone
+from core.connection_pool import get_pool
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "db", "audit.db"))
+DB_PATH = os.path.abspath(os.getenv("AUDIT_DB_PATH", os.path.join(BASE_DIR, "..", "db", "audit.db")))
+
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "256"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.05"))
+AUDIT_SYNCHRONOUS = os.getenv("AUDIT_SYNCHRONOUS", "0") == "1"
+AUDIT_RETRY_BACKOFF = float(os.getenv("AUDIT_RETRY_BACKOFF", "0.05"))
+AUDIT_RETRY_BACKOFF_MAX = float(os.getenv("AUDIT_RETRY_BACKOFF_MAX", "5"))
+AUDIT_WRITE_RETRIES = int(os.getenv("AUDIT_WRITE_RETRIES", "5"))
+
+SCHEMA_VERSION = 3
+
+# Who wrote a record: the kernel's own decision, the API's per-request summary
+# of it, or the simulation endpoint flagging PII before anything is governed
+AUDIT_SOURCES = ("kernel", "api", "simulation")
+
+INSERT_AUDIT_SQL = """
+    INSERT INTO audit_logs
+    (timestamp, user_input, sql, decision, reason, simulation, query_type, tables_accessed, policy_version, source)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+logger = logging.getLogger(__name__)
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS audit_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT,
-        user_input TEXT,
-        sql TEXT,
-        decision TEXT,
-        reason TEXT,
-        simulation TEXT
-    )
+    with get_pool(DB_PATH).connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS audit_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            user_input TEXT,
+            sql TEXT,
+            decision TEXT,
+            reason TEXT,
+            simulation TEXT
+        )
+        """)
+        _migrate(conn)
+        conn.commit()
+
+def _migrate(conn):
+    """Bring an audit database up to SCHEMA_VERSION, one version step at a time"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < 1:
+        _migrate_v1(conn)
+    if version < 2:
+        _migrate_v2(conn)
+    if version < 3:
+        _migrate_v3(conn)
+
+def _migrate_v1(conn):
+    """Extracted query_type/tables_accessed columns and the per-table index, backfilled"""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(audit_logs)")}
+    for column in ("query_type", "tables_accessed"):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE audit_logs ADD COLUMN {column} TEXT")
+
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS audit_log_tables (
+            audit_id INTEGER NOT NULL,
+            table_name TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_audit_log_tables_table ON audit_log_tables(table_name, audit_id);
+        CREATE INDEX IF NOT EXISTS idx_audit_logs_decision ON audit_logs(decision, id);
+        CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs(timestamp);
+
+        CREATE TRIGGER IF NOT EXISTS audit_logs_index_tables AFTER INSERT ON audit_logs
+        WHEN json_valid(NEW.tables_accessed)
+        BEGIN
+            INSERT INTO audit_log_tables (audit_id, table_name)
+            SELECT NEW.id, lower(value) FROM json_each(NEW.tables_accessed);
+        END;
+    """)
+
+    conn.execute("BEGIN")
+    conn.execute("""
+        UPDATE audit_logs
+        SET query_type = json_extract(simulation, '$.query_type'),
+            tables_accessed = json_extract(simulation, '$.tables_accessed')
+        WHERE query_type IS NULL AND json_valid(simulation)
     """)
+    conn.execute("DELETE FROM audit_log_tables")
+    conn.execute("""
+        INSERT INTO audit_log_tables (audit_id, table_name)
+        SELECT a.id, lower(t.value)
+        FROM audit_logs a, json_each(a.tables_accessed) t
+        WHERE json_valid(a.tables_accessed)
+    """)
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+
+def _migrate_v2(conn):
+    """Policy version each decision was made under; older rows stay NULL"""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(audit_logs)")}
+    if "policy_version" not in existing:
+        conn.execute("ALTER TABLE audit_logs ADD COLUMN policy_version INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_policy_version ON audit_logs(policy_version, id)")
+    conn.execute("PRAGMA user_version = 2")
+    conn.commit()
+
+def _migrate_v3(conn):
+    """Source of each record, backfilled from how older rows were written.
+
+    An API summary was logged right after the kernel's own row for the same
+    statement, which has no user input; batch rows carry user input but no summary.
+    """
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(audit_logs)")}
+    if "source" not in existing:
+        conn.execute("ALTER TABLE audit_logs ADD COLUMN source TEXT")
+    conn.execute("BEGIN")
+    conn.execute("""
+        UPDATE audit_logs
+        SET source = CASE
+            WHEN reason = 'PII detected - blocked at UI level' THEN 'simulation'
+            WHEN user_input IS NOT NULL AND EXISTS (
+                SELECT 1 FROM audit_logs kernel
+                WHERE kernel.id BETWEEN audit_logs.id - 100 AND audit_logs.id - 1
+                  AND kernel.user_input IS NULL AND kernel.sql = audit_logs.sql
+            ) THEN 'api'
+            ELSE 'kernel'
+        END
+        WHERE source IS NULL
+    """)
+    conn.execute("PRAGMA user_version = 3")
     conn.commit()
-    conn.close()
-
-def log_audit(user_input, sql, decision, reason, simulation):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO audit_logs
-        (timestamp, user_input, sql, decision, reason, simulation)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (
+
+class AuditWriter:
+    """Group-commit writer for audit records.
+
+    Callers enqueue records and return immediately; a worker thread writes them
+    in one transaction per batch, flushing when `batch_size` records are queued
+    or `flush_interval` seconds have passed. A full queue blocks callers until
+    the worker catches up. With `synchronous=True` every record is written
+    before `submit` returns, which keeps tests deterministic.
+
+    A batch that hits a transient error (locked or busy database) is retried with
+    exponential backoff, up to `max_retries` attempts. A batch that still fails,
+    or fails with any other error, is appended to `<db_path>.unwritten.jsonl`
+    and the worker moves on, so one bad batch cannot stall the queue.
+    """
+
+    _STOP = object()
+
+    def __init__(self, db_path: str = DB_PATH, batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_interval: float = AUDIT_FLUSH_INTERVAL, queue_size: int = AUDIT_QUEUE_SIZE,
+                 synchronous: bool = AUDIT_SYNCHRONOUS, retry_backoff: float = AUDIT_RETRY_BACKOFF,
+                 max_retries: int = AUDIT_WRITE_RETRIES):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.synchronous = synchronous
+        self.retry_backoff = retry_backoff
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, record: tuple) -> None:
+        if self.synchronous or self._closed:
+            self._write([record])
+            return
+        self._ensure_started()
+        self._queue.put(record)
+
+    def submit_many(self, records: list) -> None:
+        if self.synchronous or self._closed:
+            self._write(records)
+            return
+        self._ensure_started()
+        for record in records:
+            self._queue.put(record)
+
+    def flush(self) -> None:
+        """Block until every record queued so far has been committed"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Flush pending records and stop the worker; later records are written synchronously"""
+        with self._start_lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(self._STOP)
+            thread.join()
+        # Records that raced with shutdown are still committed, just synchronously
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP:
+                leftovers.append(item)
+            self._queue.task_done()
+        if leftovers:
+            self._write_batch(leftovers)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                self._queue.task_done()
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: list) -> None:
+        delay, attempts = self.retry_backoff, 0
+        while True:
+            try:
+                self._write(batch)
+                return
+            except Exception as exc:
+                attempts += 1
+                logger.exception("Failed to write %d audit records (attempt %d)", len(batch), attempts)
+                if not isinstance(exc, sqlite3.OperationalError) or attempts >= self.max_retries:
+                    self._spill(batch)
+                    return
+                time.sleep(delay)
+                delay = min(delay * 2, AUDIT_RETRY_BACKOFF_MAX)
+
+    def _spill(self, batch: list) -> None:
+        path = f"{self.db_path}.unwritten.jsonl"
+        try:
+            with open(path, "a") as f:
+                for record in batch:
+                    f.write(json.dumps(record) + "\n")
+            logger.error("Spilled %d unwritten audit records to %s", len(batch), path)
+        except OSError:
+            logger.exception("Lost %d audit records: could not spill them to %s", len(batch), path)
+
+    def _write(self, records: list) -> None:
+        with get_pool(self.db_path).connection() as conn:
+            conn.executemany(INSERT_AUDIT_SQL, records)
+            conn.commit()
+
+_writer = AuditWriter()
+_writer_lock = threading.Lock()
+
+def get_audit_writer() -> AuditWriter:
+    return _writer
+
+def configure_audit_writer(**kwargs) -> AuditWriter:
+    """Replace the shared writer, flushing the old one first"""
+    global _writer
+    with _writer_lock:
+        _writer.close()
+        _writer = AuditWriter(**kwargs)
+        return _writer
+
+def shutdown_audit_writer() -> None:
+    _writer.close()
+
+atexit.register(shutdown_audit_writer)
+
+def _audit_record(user_input, sql, decision, reason, simulation, policy_version=None, source=None) -> tuple:
+    return (
         datetime.now(timezone.utc).isoformat(),
         user_input,
         sql,
         decision,
         reason,
-        json.dumps(simulation)
-    ))
-    conn.commit()
-    conn.close()
\ No newline at end of file
+        json.dumps(simulation),
+        simulation.get("query_type") if isinstance(simulation, dict) else None,
+        json.dumps(simulation.get("tables_accessed") or []) if isinstance(simulation, dict) else None,
+        policy_version,
+        source
+    )
+
+def log_audit(user_input, sql, decision, reason, simulation, policy_version=None, source=None):
+    _writer.submit(_audit_record(user_input, sql, decision, reason, simulation, policy_version, source))
+
+def log_audit_many(entries: list):
+    """Queue several audit records at once; each entry holds log_audit's keyword arguments"""
+    _writer.submit_many([_audit_record(**entry) for entry in entries])
+
+AUDIT_LOG_COLUMNS = ("id", "timestamp", "user_input", "sql", "decision", "reason", "query_type", "tables_accessed",
+                     "policy_version", "source")
+
+def query_audit_logs(limit: int = 50, cursor: int = None, decision: str = None, since: str = None,
+                     until: str = None, table: str = None, include_simulation: bool = False,
+                     policy_version: int = None, source: str = None) -> dict:
+    """Newest-first page of audit logs; pass the returned next_cursor to fetch the following page"""
+    columns = list(AUDIT_LOG_COLUMNS) + (["simulation"] if include_simulation else [])
+    clauses, params = [], []
+    if cursor is not None:
+        clauses.append("id < ?")
+        params.append(cursor)
+    if decision:
+        clauses.append("decision = ?")
+        params.append(decision)
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("timestamp < ?")
+        params.append(until)
+    if table:
+        clauses.append("id IN (SELECT audit_id FROM audit_log_tables WHERE table_name = ?)")
+        params.append(table.lower())
+    if policy_version is not None:
+        clauses.append("policy_version = ?")
+        params.append(policy_version)
+    if source:
+        clauses.append("source = ?")
+        params.append(source)
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"SELECT {', '.join(columns)} FROM audit_logs {where} ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+
+    with get_pool(DB_PATH).connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    logs = []
+    for row in rows:
+        raw = dict(zip(columns, row))
+        log = {column: (value if value is not None else "") for column, value in raw.items()}
+        log["policy_version"] = raw["policy_version"]
+        try:
+            log["tables_accessed"] = json.loads(raw["tables_accessed"]) if raw["tables_accessed"] else []
+        except ValueError:
+            log["tables_accessed"] = []
+        if include_simulation:
+            try:
+                log["simulation"] = json.loads(raw["simulation"] or "{}")
+            except ValueError:
+                log["simulation"] = {}
+        logs.append(log)
+
+    next_cursor = logs[-1]["id"] if len(logs) == limit else None
+    return {"logs": logs, "next_cursor": next_cursor}
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+DEFAULT_POOL_TIMEOUT = float(os.getenv("SQLITE_POOL_TIMEOUT", "30"))
+
+# Applied once when a connection is opened, never per request
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -64000),
+    ("mmap_size", 268435456),
+    ("busy_timeout", 5000),
+)
+
+class PoolTimeout(RuntimeError):
+    pass
+
+# Callables run once on every pooled connection, e.g. to register SQL functions
+_connection_hooks = []
+
+def register_connection_hook(hook) -> None:
+    if hook not in _connection_hooks:
+        _connection_hooks.append(hook)
+
+class ConnectionPool:
+    """Capped pool of long-lived SQLite connections for one database file.
+
+    A thread that checks out a connection keeps it until its outermost release,
+    so nested checkouts share one connection, and it gets the same connection
+    back next time whenever that connection is idle.
+    """
+
+    def __init__(self, path: str, max_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_POOL_TIMEOUT):
+        self.path = os.path.abspath(path)
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._hooks_applied = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        for name, value in PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _checkout(self, preferred: sqlite3.Connection = None) -> sqlite3.Connection:
+        deadline = time.monotonic() + self.timeout
+        conn = None
+        with self._cond:
+            while True:
+                if preferred is not None and any(c is preferred for c in self._idle):
+                    self._idle = [c for c in self._idle if c is not preferred]
+                    conn = preferred
+                    break
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No SQLite connection available for {self.path} within {self.timeout}s")
+                self._cond.wait(remaining)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        # Hooks registered after this connection was opened are applied on checkout
+        applied = self._hooks_applied.get(id(conn), 0)
+        for hook in _connection_hooks[applied:]:
+            hook(conn)
+        self._hooks_applied[id(conn)] = len(_connection_hooks)
+        return conn
+
+    def _checkin(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def acquire(self) -> sqlite3.Connection:
+        held = getattr(self._local, "held", None)
+        if held is not None:
+            held[1] += 1
+            return held[0]
+
+        conn = self._checkout(preferred=getattr(self._local, "last", None))
+        self._local.held = [conn, 1]
+        self._local.last = conn
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        held = getattr(self._local, "held", None)
+        if held is None or held[0] is not conn:
+            raise RuntimeError("Connection released by a thread that does not hold it")
+        held[1] -= 1
+        if held[1]:
+            return
+        self._local.held = None
+        self._checkin(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    @contextmanager
+    def detached(self):
+        """Checkout that is not bound to the calling thread, for cursors that are
+        consumed from several threads (e.g. a streamed response)"""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    def close(self) -> None:
+        with self._cond:
+            for conn in self._idle:
+                self._hooks_applied.pop(id(conn), None)
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle = []
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(path: str) -> ConnectionPool:
+    key = os.path.abspath(path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(key)
+        return pool
+
+def close_all_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
@@ -0,0 +1,202 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+from core.connection_pool import get_pool
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.abspath(os.getenv("EPISODIC_DB_PATH", os.path.join(BASE_DIR, "..", "db", "episodic.db")))
+
+EPISODIC_MEMORY_WINDOW = int(os.getenv("EPISODIC_MEMORY_WINDOW", "10"))
+EPISODIC_MEMORY_SESSIONS = int(os.getenv("EPISODIC_MEMORY_SESSIONS", "1024"))
+EPISODIC_MEMORY_PERSIST = os.getenv("EPISODIC_MEMORY_PERSIST", "0") == "1"
+
+DEFAULT_SESSION = "default"
+
+def simulated_rows(simulation: Dict[str, Any]) -> int:
+    """Rows a simulation returned, or would modify for an UPDATE"""
+    if simulation.get("query_type") == "UPDATE":
+        return simulation.get("rows_affected", 0) or 0
+    return simulation.get("rows_returned", 0) or 0
+
+def pii_columns(simulation: Dict[str, Any]) -> List[str]:
+    """PII columns a simulation touched, by output name or by the source column SQLite read"""
+    return sorted(
+        {col for col, kind in simulation.get("column_classification", {}).items() if kind == "PII"}
+        | {col for col, kind in simulation.get("source_classification", {}).items() if kind == "PII"}
+    )
+
+class SessionMemory:
+    """Ring buffer of one session's recent queries with rolling aggregates.
+
+    Row volume, PII queries and denials are adjusted as entries enter and
+    leave the window, so reading them never walks the buffer.
+    """
+
+    def __init__(self, session_id: str, window: int = EPISODIC_MEMORY_WINDOW):
+        self.session_id = session_id
+        self.window = window
+        self._entries = deque()
+        self._lock = threading.Lock()
+        self.row_volume = 0
+        self.pii_queries = 0
+        self.decided = 0
+        self.denials = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _admit(self, entry: dict) -> Optional[dict]:
+        evicted = None
+        if len(self._entries) >= self.window:
+            evicted = self._entries.popleft()
+            evicted["in_window"] = False
+            self.row_volume -= evicted["rows"]
+            self.pii_queries -= evicted["pii"]
+            if evicted["denied"] is not None:
+                self.decided -= 1
+                self.denials -= evicted["denied"]
+        entry["in_window"] = True
+        self._entries.append(entry)
+        self.row_volume += entry["rows"]
+        self.pii_queries += entry["pii"]
+        if entry["denied"] is not None:
+            self.decided += 1
+            self.denials += entry["denied"]
+        return evicted
+
+    def append(self, sql: str, simulation: Dict[str, Any], timestamp: float = None) -> Tuple[dict, Optional[dict]]:
+        """Add an entry; returns it together with the entry it pushed out of the window, if any"""
+        entry = {
+            "sql": sql,
+            "simulation": simulation,
+            "timestamp": timestamp or time.time(),
+            "rows": simulated_rows(simulation),
+            "columns": len(simulation.get("columns_accessed", [])),
+            "pii": bool(pii_columns(simulation)),
+            "denied": None,
+        }
+        with self._lock:
+            evicted = self._admit(entry)
+        return entry, evicted
+
+    def resolve(self, entry: dict, denied: bool) -> None:
+        """Record the governance outcome of an entry returned by append()"""
+        with self._lock:
+            if entry["denied"] is None and entry["in_window"]:
+                self.decided += 1
+                self.denials += bool(denied)
+            entry["denied"] = bool(denied)
+
+    def aggregates(self) -> Dict[str, Any]:
+        with self._lock:
+            queries = len(self._entries)
+            return {
+                "queries": queries,
+                "row_volume": self.row_volume,
+                "pii_queries": self.pii_queries,
+                "pii_rate": round(self.pii_queries / queries, 4) if queries else 0.0,
+                "denials": self.denials,
+                "denial_rate": round(self.denials / self.decided, 4) if self.decided else 0.0,
+            }
+
+    def recent(self, n: int = None) -> List[dict]:
+        with self._lock:
+            entries = list(self._entries)
+        return [
+            {key: entry[key] for key in ("sql", "simulation", "timestamp", "rows", "columns", "pii", "denied")}
+            for entry in (entries[-n:] if n else entries)
+        ]
+
+class EpisodicMemory:
+    """Per-session SessionMemory buffers, least recently used sessions evicted first.
+
+    With persistence enabled every entry is also written to SQLite and the last
+    `window` entries of each session are reloaded on startup.
+    """
+
+    def __init__(self, window: int = EPISODIC_MEMORY_WINDOW, max_sessions: int = EPISODIC_MEMORY_SESSIONS,
+                 persist: bool = EPISODIC_MEMORY_PERSIST, path: str = DB_PATH):
+        self.window = window
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.path = path if persist else None
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._init_db()
+            self._load()
+
+    def session(self, session_id: str = DEFAULT_SESSION) -> SessionMemory:
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = self._sessions[session_id] = SessionMemory(session_id, self.window)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return memory
+
+    def remember(self, sql: str, simulation: Dict[str, Any], session_id: str = DEFAULT_SESSION) -> dict:
+        entry, evicted = self.session(session_id).append(sql, simulation)
+        if self.path:
+            with get_pool(self.path).connection() as conn:
+                cursor = conn.execute(
+                    "INSERT INTO episodic_memory (session_id, timestamp, sql, simulation) VALUES (?, ?, ?, ?)",
+                    (session_id, entry["timestamp"], sql, json.dumps(simulation))
+                )
+                entry["row_id"] = cursor.lastrowid
+                if evicted is not None and evicted.get("row_id") is not None:
+                    conn.execute("DELETE FROM episodic_memory WHERE id = ?", (evicted["row_id"],))
+                conn.commit()
+        return entry
+
+    def resolve(self, entry: dict, denied: bool, session_id: str = DEFAULT_SESSION) -> None:
+        self.session(session_id).resolve(entry, denied)
+        if self.path and entry.get("row_id") is not None:
+            with get_pool(self.path).connection() as conn:
+                conn.execute("UPDATE episodic_memory SET denied = ? WHERE id = ?", (int(bool(denied)), entry["row_id"]))
+                conn.commit()
+
+    def sessions(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {memory.session_id: memory.aggregates() for memory in sessions}
+
+    def view(self, session_id: str = DEFAULT_SESSION) -> Dict[str, Any]:
+        with self._lock:
+            memory = self._sessions.get(session_id) or SessionMemory(session_id, self.window)
+        return {"session_id": session_id, "entries": memory.recent(), "aggregates": memory.aggregates()}
+
+    def _init_db(self) -> None:
+        with get_pool(self.path).connection() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS episodic_memory (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                timestamp REAL,
+                sql TEXT,
+                simulation TEXT,
+                denied INTEGER
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_episodic_memory_session ON episodic_memory(session_id, id)")
+            conn.commit()
+
+    def _load(self) -> None:
+        with get_pool(self.path).connection() as conn:
+            rows = conn.execute("""
+                SELECT id, session_id, timestamp, sql, simulation, denied FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY session_id ORDER BY id DESC) AS recency
+                    FROM episodic_memory
+                ) WHERE recency <= ? ORDER BY id
+            """, (self.window,)).fetchall()
+        for row_id, session_id, timestamp, sql, simulation, denied in rows:
+            memory = self.session(session_id)
+            entry, _ = memory.append(sql, json.loads(simulation or "{}"), timestamp)
+            entry["row_id"] = row_id
+            if denied is not None:
+                memory.resolve(entry, bool(denied))
@@ -1,130 +1,326 @@
 import sqlite3
 import time
 import os
-from agents.tools import classify_columns
+from contextlib import contextmanager
+from agents.tools import classify_columns, classify_reads
+from core.connection_pool import get_pool
+from core.sql_analysis import SQLAnalysisError, analyze_sql, derived_column_names, statement_body
+from core.sandbox.simulation_cache import bump_table_versions
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "db", "app.db")
+DB_PATH = os.getenv("APP_DB_PATH", os.path.join(os.path.dirname(__file__), "..", "..", "db", "app.db"))
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
+# "execute" runs the statement and fetches the full result; "plan" only prepares
+# it and counts rows inside SQLite, so cost follows the query plan, not result size.
+SIMULATION_MODES = ("execute", "plan")
+DEFAULT_SIMULATION_MODE = os.getenv("SIMULATION_MODE", "plan")
+
 class SandboxManager:
-    def __init__(self, schema: dict):
+    def __init__(self, schema: dict, mode: str = DEFAULT_SIMULATION_MODE):
+        if mode not in SIMULATION_MODES:
+            raise ValueError(f"Unknown simulation mode: {mode}")
         self.schema = schema
-        self.conn = sqlite3.connect(DB_PATH)
+        self.mode = mode
+        self.pool = get_pool(DB_PATH)
+        self.conn = self.pool.acquire()
+        if mode == "plan":
+            # Plan mode never writes, so refuse writes outright instead of locking
+            self.conn.execute("PRAGMA query_only = ON")
         self.cursor = self.conn.cursor()
 
     def simulate_query(self, query: str):
         start = time.time()
         try:
-            query_upper = query.strip().upper()
-            if query_upper.startswith("UPDATE"):
-                query_type = "UPDATE"
-            elif query_upper.startswith("SELECT"):
-                query_type = "SELECT"
-            else:
+            analysis = analyze_sql(query)
+            query_type = analysis.statement_type
+            if query_type not in ("SELECT", "UPDATE"):
                 return {
                     "valid": False,
                     "error": "Unsupported query type"
                 }
 
-            self.cursor.execute(query)
+            reads = []
+            if self.mode == "plan" and query_type == "SELECT":
+                result = self._plan_select(query, start, analysis, reads)
+            elif self.mode == "plan":
+                result = self._plan_update(query, start, analysis, reads)
+            else:
+                result = self._execute(query, start, analysis, reads)
 
-            if query_type == "UPDATE":
-                affected_rows = self.cursor.rowcount
-                duration = round((time.time() - start) * 1000, 2)
+            result["predicates"] = list(analysis.predicates)
+            result["predicate_columns"] = analysis.predicate_column_names(self.schema)
+            result.update(_source_fields(reads, analysis, self.schema))
+            return result
 
-                import re
-                set_match = re.search(r'SET\s+([^WHERE]+)', query_upper, re.IGNORECASE)
-                columns_accessed = []
-                if set_match:
-                    set_clause = set_match.group(1)
-                    assignments = [part.strip() for part in set_clause.split(',')]
-                    for assignment in assignments:
-                        if '=' in assignment:
-                            col_name = assignment.split('=')[0].strip()
-                            columns_accessed.append(col_name)
+        except Exception as e:
+            return {
+                "valid": False,
+                "error": str(e)
+            }
 
-                classified_columns = classify_columns(columns_accessed)
+    @contextmanager
+    def _tracking(self, reads: list, updates: list = None):
+        """Record every (table, column) the statements prepared meanwhile read or update"""
+        def authorizer(action, arg1, arg2, db_name, source):
+            if arg1 and not arg1.startswith("sqlite_"):
+                if action == sqlite3.SQLITE_READ:
+                    reads.append((arg1, arg2))
+                elif action == sqlite3.SQLITE_UPDATE and updates is not None:
+                    updates.append((arg1, arg2))
+            return sqlite3.SQLITE_OK
 
-                return {
-                    "valid": True,
-                    "query_type": "UPDATE",
-                    "columns_accessed": columns_accessed,
-                    "column_classification": classified_columns,
-                    "rows_affected": affected_rows,
-                    "execution_time_ms": duration
-                }
+        self.conn.set_authorizer(authorizer)
+        try:
+            yield
+        finally:
+            self.conn.set_authorizer(None)
 
-            else:  # SELECT query
-                rows = self.cursor.fetchall()
-                duration = round((time.time() - start) * 1000, 2)
+    def _execute(self, query: str, start: float, analysis, reads: list) -> dict:
+        with self._tracking(reads):
+            self.cursor.execute(query)
 
-                columns = [desc[0] for desc in self.cursor.description]
-                tables_accessed = self._extract_tables_from_query(query)
-                classified_columns = classify_columns(columns)
+        if analysis.statement_type == "UPDATE":
+            affected_rows = self.cursor.rowcount
+            duration = round((time.time() - start) * 1000, 2)
+            columns_accessed = list(analysis.set_columns)
 
-                return {
-                    "valid": True,
-                    "query_type": "SELECT",
-                    "tables_accessed": tables_accessed,
-                    "columns_accessed": columns,
-                    "column_classification": classified_columns,
-                    "rows_returned": len(rows),
-                    "execution_time_ms": duration
-                }
-
-        except Exception as e:
             return {
-                "valid": False,
-                "error": str(e)
+                "valid": True,
+                "query_type": "UPDATE",
+                "tables_accessed": list(analysis.tables),
+                "columns_accessed": columns_accessed,
+                "column_classification": classify_columns(columns_accessed, analysis.tables[:1]),
+                "rows_affected": affected_rows,
+                "execution_time_ms": duration
             }
 
+        rows = self.cursor.fetchall()
+        duration = round((time.time() - start) * 1000, 2)
+        columns = [desc[0] for desc in self.cursor.description]
+
+        return {
+            "valid": True,
+            "query_type": "SELECT",
+            "tables_accessed": list(analysis.tables),
+            "columns_accessed": columns,
+            "column_classification": classify_columns(columns, analysis.tables),
+            "rows_returned": len(rows),
+            "execution_time_ms": duration
+        }
+
     def teardown(self):
-        self.conn.close()
-
-    def _extract_tables_from_query(self, query: str) -> list:
-        """Extract table names from SQL query"""
-        import re
-        query_upper = query.strip().upper()
-
-        # Look for FROM clause
-        from_match = re.search(r'\bFROM\s+([^\s;]+)', query_upper, re.IGNORECASE)
-        if from_match:
-            from_clause = from_match.group(1).strip()
-            # Handle JOINs
-            tables = []
-            for part in from_clause.split('JOIN'):
-                table = part.strip().split()[0].strip()
-                if table and table != ',':
-                    tables.append(table)
-            return tables if tables else [from_clause.split()[0].strip()]
-
-        # Look for table references in query
-        table_pattern = r'\b(?:FROM|JOIN|UPDATE)\s+([a-zA-Z_][a-zA-Z0-9_]*)'
-        matches = re.findall(table_pattern, query_upper)
-        return matches if matches else []
+        if self.mode == "plan":
+            self.conn.execute("PRAGMA query_only = OFF")
+        self.pool.release(self.conn)
 
-def execute_query(sql: str):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    def _plan_select(self, query: str, start: float, analysis, reads: list) -> dict:
+        """Simulate a SELECT without materializing its result set in Python"""
+        statement = statement_body(query)
 
-    sql_upper = sql.strip().upper()
-    is_update = sql_upper.startswith("UPDATE")
+        # Preparing the plan fires the authorizer for every table/column read
+        with self._tracking(reads):
+            self.cursor.execute(f"EXPLAIN QUERY PLAN {statement}")
+            query_plan = [row[3] for row in self.cursor.fetchall()]
 
-    cursor.execute(sql)
+        self.cursor.execute(f"SELECT * FROM ({statement}) LIMIT 0")
+        columns = derived_column_names([desc[0] for desc in self.cursor.description])
+
+        self.cursor.execute(f"SELECT COUNT(*) FROM ({statement})")
+        rows_returned = self.cursor.fetchone()[0]
+        duration = round((time.time() - start) * 1000, 2)
+
+        tables_accessed = list(dict.fromkeys(table for table, _ in reads)) or list(analysis.tables)
 
-    if is_update:
-        conn.commit()
-        affected_rows = cursor.rowcount
-        conn.close()
         return {
-            "operation": "UPDATE",
-            "affected_rows": affected_rows
+            "valid": True,
+            "query_type": "SELECT",
+            "tables_accessed": tables_accessed,
+            "columns_accessed": columns,
+            "column_classification": classify_columns(columns, tables_accessed),
+            "rows_returned": rows_returned,
+            "query_plan": query_plan,
+            "simulation_mode": "plan",
+            "execution_time_ms": duration
         }
-    else:
-        rows = cursor.fetchall()
-        columns = [desc[0] for desc in cursor.description]
-        conn.close()
+
+    def _plan_update(self, query: str, start: float, analysis, reads: list) -> dict:
+        """Simulate an UPDATE as a read-only COUNT(*) over the rows it would touch"""
+        statement = statement_body(query)
+        if analysis.row_count_sql is None or analysis.target is None:
+            raise ValueError("Could not parse UPDATE statement")
+        updates = []
+
+        # Preparing the plan validates the statement and reports the SET columns
+        # without executing it, so no write lock is ever requested
+        with self._tracking(reads, updates):
+            self.cursor.execute(f"EXPLAIN QUERY PLAN {statement}")
+            query_plan = [row[3] for row in self.cursor.fetchall()]
+
+        self.cursor.execute(analysis.row_count_sql)
+        affected_rows = self.cursor.fetchone()[0]
+        duration = round((time.time() - start) * 1000, 2)
+
+        columns_accessed = list(dict.fromkeys(column for _, column in updates)) or list(analysis.set_columns)
+        tables_accessed = list(dict.fromkeys([analysis.target] + [table for table, _ in reads]))
+
         return {
-            "columns": columns,
-            "rows": rows
+            "valid": True,
+            "query_type": "UPDATE",
+            "tables_accessed": tables_accessed,
+            "columns_accessed": columns_accessed,
+            "column_classification": classify_columns(columns_accessed, [analysis.target]),
+            "rows_affected": affected_rows,
+            "query_plan": query_plan,
+            "simulation_mode": "plan",
+            "execution_time_ms": duration
         }
+
+def _source_fields(reads: list, analysis, schema: dict) -> dict:
+    """The columns SQLite reads anywhere in the statement, and those used other than as a plain output.
+
+    A SELECT column counts as direct only when every reference to it is a bare
+    entry of the outer select list; everything an UPDATE reads is indirect.
+    """
+    source = list(dict.fromkeys(column for _, column in reads))
+    direct = set()
+    if analysis.statement_type == "SELECT":
+        indirect = {name.lower() for name in analysis.indirect_column_names(schema)}
+        direct = {name.lower() for name in analysis.column_names(schema)} - indirect
+    return {
+        "source_columns": source,
+        "source_classification": classify_reads(reads),
+        "indirect_columns": [column for column in source if column.lower() not in direct],
+    }
+
+def _update_targets(sql: str) -> list:
+    try:
+        target = analyze_sql(sql).target
+    except SQLAnalysisError:
+        return []
+    return [target] if target else []
+
+def execute_query(sql: str):
+    sql_upper = sql.strip().upper()
+    is_update = sql_upper.startswith("UPDATE")
+
+    with get_pool(DB_PATH).connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql)
+
+        if is_update:
+            conn.commit()
+            affected_rows = cursor.rowcount
+            bump_table_versions(_update_targets(sql))
+            return {
+                "operation": "UPDATE",
+                "affected_rows": affected_rows
+            }
+        else:
+            rows = cursor.fetchall()
+            columns = [desc[0] for desc in cursor.description]
+            return {
+                "columns": columns,
+                "rows": rows
+            }
+
+def execute_in_transaction(sql: str, approve=None) -> dict:
+    """Execute a write exactly once inside a held transaction.
+
+    `approve(affected_rows)` decides between commit and rollback after the
+    statement has run but before anything is visible to other connections.
+    """
+    with get_pool(DB_PATH).connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(sql)
+            affected_rows = cursor.rowcount
+            committed = approve is None or approve(affected_rows)
+            if committed:
+                conn.commit()
+                bump_table_versions(_update_targets(sql))
+            else:
+                conn.rollback()
+        except Exception:
+            conn.rollback()
+            raise
+    return {
+        "operation": "UPDATE",
+        "affected_rows": affected_rows,
+        "committed": committed
+    }
+
+def execute_batch_in_transaction(statements: list, writes: bool = True) -> list:
+    """Run (sql, approve) pairs in one transaction, each under its own savepoint.
+
+    Reads return their rows; writes consult `approve(affected_rows)`. A statement
+    that fails or is not approved is rolled back on its own and the rest commit
+    together with a single COMMIT. Pass `writes=False` for a batch of reads: it
+    then runs in a deferred transaction and never takes the write lock.
+    """
+    if not statements:
+        return []
+    results, written = [], []
+    with get_pool(DB_PATH).connection() as conn:
+        conn.execute("BEGIN IMMEDIATE" if writes else "BEGIN")
+        try:
+            for sql, approve in statements:
+                conn.execute("SAVEPOINT batch_statement")
+                try:
+                    cursor = conn.execute(sql)
+                    if cursor.description is not None:
+                        result = {
+                            "columns": [desc[0] for desc in cursor.description],
+                            "rows": cursor.fetchall(),
+                            "committed": True
+                        }
+                    else:
+                        affected_rows = cursor.rowcount
+                        result = {
+                            "operation": "UPDATE",
+                            "affected_rows": affected_rows,
+                            "committed": approve is None or approve(affected_rows)
+                        }
+                        if result["committed"]:
+                            written.extend(_update_targets(sql))
+                    if not result["committed"]:
+                        conn.execute("ROLLBACK TO batch_statement")
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO batch_statement")
+                    result = {"error": str(e), "committed": False}
+                conn.execute("RELEASE batch_statement")
+                results.append(result)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    if written:
+        bump_table_versions(written)
+    return results
+
+def describe_query(sql: str) -> list:
+    """Column names of a SELECT used as a derived table, without reading any rows"""
+    statement = statement_body(sql)
+    with get_pool(DB_PATH).connection() as conn:
+        cursor = conn.execute(f"SELECT * FROM ({statement}) LIMIT 0")
+        return [desc[0] for desc in cursor.description]
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+def stream_query(sql: str, batch_size: int = STREAM_BATCH_SIZE):
+    """Yield the column names, then batches of rows fetched with fetchmany.
+
+    The connection stays checked out until the generator is exhausted or closed,
+    so callers must close it when they stop early.
+    """
+    with get_pool(DB_PATH).detached() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql)
+            yield [desc[0] for desc in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
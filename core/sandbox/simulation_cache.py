@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from core.sql_analysis import SQLAnalysisError, analyze_sql
+
+SIMULATION_CACHE_ENTRIES = int(os.getenv("SIMULATION_CACHE_ENTRIES", "1024"))
+SIMULATION_CACHE_BYTES = int(os.getenv("SIMULATION_CACHE_BYTES", str(16 * 1024 * 1024)))
+SIMULATION_CACHE_TTL = float(os.getenv("SIMULATION_CACHE_TTL", "300"))
+
+# Bumped by every committed write. "*" covers writes whose target table is unknown.
+_table_versions = {}
+_versions_lock = threading.Lock()
+
+def bump_table_versions(tables) -> None:
+    with _versions_lock:
+        for table in tables or ["*"]:
+            key = table.lower()
+            _table_versions[key] = _table_versions.get(key, 0) + 1
+
+def version_snapshot() -> dict:
+    """Write versions of every table; take it before simulating and hand it to put()"""
+    with _versions_lock:
+        return dict(_table_versions)
+
+def table_versions(tables, versions: dict = None) -> tuple:
+    versions = _table_versions if versions is None else versions
+    keys = ["*"] + sorted({table.lower() for table in tables})
+    return tuple(versions.get(key, 0) for key in keys)
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace outside string literals and drop the trailing semicolon"""
+    out, quote, pending_space = [], None, False
+    for ch in sql.strip().rstrip(";").strip():
+        if quote:
+            out.append(ch)
+            if ch == quote:
+                quote = None
+            continue
+        if ch.isspace():
+            pending_space = True
+            continue
+        if pending_space and out:
+            out.append(" ")
+        pending_space = False
+        if ch in "'\"`":
+            quote = ch
+        out.append(ch)
+    return "".join(out)
+
+def cache_key(sql: str) -> str:
+    """Token fingerprint of the statement, so formatting differences share an entry"""
+    try:
+        return analyze_sql(sql).fingerprint
+    except SQLAnalysisError:
+        return normalize_sql(sql)
+
+class SimulationCache:
+    """LRU cache of simulation results with a TTL and a byte budget.
+
+    An entry is valid only while the write versions of the tables it read are
+    unchanged, so an UPDATE committed through execute_query invalidates every
+    cached simulation over that table. The TTL bounds staleness from writers
+    outside this process.
+    """
+
+    def __init__(self, max_entries: int = SIMULATION_CACHE_ENTRIES, max_bytes: int = SIMULATION_CACHE_BYTES,
+                 ttl: float = SIMULATION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, sql: str, mode: str = "") -> dict:
+        key = (mode, cache_key(sql))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                payload, tables, versions, expires_at = entry
+                if expires_at > time.monotonic() and versions == table_versions(tables):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(payload)
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, sql: str, simulation: dict, mode: str = "", versions: dict = None) -> None:
+        """Cache `simulation` as of `versions`, the version_snapshot() taken before it was run.
+
+        A write committed while the statement was simulating then invalidates
+        the entry at once instead of being stamped as already seen.
+        """
+        if not simulation.get("valid"):
+            return
+        key = (mode, cache_key(sql))
+        tables = tuple(simulation.get("tables_accessed") or [])
+        payload = json.dumps(simulation)
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (payload, tables, table_versions(tables, versions), time.monotonic() + self.ttl)
+            self._bytes += len(payload)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+simulation_cache = SimulationCache()
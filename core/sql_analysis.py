@@ -0,0 +1,547 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+SQL_ANALYSIS_CACHE_ENTRIES = int(os.getenv("SQL_ANALYSIS_CACHE_ENTRIES", "2048"))
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<ident>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+  | (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<param>[?:@$]\w*)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<op><>|!=|==|<=|>=|\|\||<<|>>|[-+*/%<>=~&|(),.;])
+""", re.VERBOSE | re.DOTALL)
+
+KEYWORDS = frozenset("""
+    ABORT ADD AFTER ALL ALTER ANALYZE AND AS ASC ATTACH AUTOINCREMENT BEFORE BEGIN BETWEEN BY CASCADE CASE
+    CAST CHECK COLLATE COLUMN COMMIT CONFLICT CONSTRAINT CREATE CROSS CURRENT_DATE CURRENT_TIME
+    CURRENT_TIMESTAMP DATABASE DEFAULT DEFERRABLE DEFERRED DELETE DESC DETACH DISTINCT DROP EACH ELSE END
+    ESCAPE EXCEPT EXCLUSIVE EXISTS EXPLAIN FAIL FALSE FOLLOWING FOR FOREIGN FROM FULL GLOB GROUP GROUPS
+    HAVING IF IGNORE IMMEDIATE IN INDEX INDEXED INITIALLY INNER INSERT INSTEAD INTERSECT INTO IS ISNULL JOIN
+    LEFT LIKE LIMIT MATCH MATERIALIZED NATURAL NOT NOTNULL NULL NULLS OF OFFSET ON OR ORDER OUTER OVER
+    PARTITION PRAGMA PRECEDING PRIMARY RAISE RANGE RECURSIVE REFERENCES REGEXP REINDEX RELEASE RENAME
+    REPLACE RESTRICT RETURNING RIGHT ROLLBACK ROWS SAVEPOINT SELECT SET TABLE TEMPORARY THEN TO TRANSACTION
+    TRIGGER TRUE UNBOUNDED UNION UNIQUE UPDATE USING VACUUM VALUES VIEW VIRTUAL WHEN WHERE WINDOW WITH
+    WITHOUT
+""".split())
+
+STATEMENT_TYPES = frozenset({
+    "SELECT", "UPDATE", "INSERT", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER",
+    "PRAGMA", "ATTACH", "DETACH", "VACUUM", "REINDEX", "ANALYZE", "BEGIN", "COMMIT", "ROLLBACK",
+})
+
+# Keywords that introduce a table reference list
+_TABLE_INTRODUCERS = frozenset({"FROM", "JOIN", "INTO"})
+_PREDICATE_KEYWORDS = frozenset({"WHERE", "ON", "HAVING"})
+# Keywords that end a WHERE/ON/HAVING condition at the same nesting depth
+_CLAUSE_BOUNDARIES = frozenset({
+    "WHERE", "ON", "HAVING", "GROUP", "ORDER", "LIMIT", "WINDOW", "UNION", "INTERSECT", "EXCEPT",
+    "RETURNING", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "NATURAL", "USING", "FROM", "SET",
+})
+_UPDATE_SET_END = frozenset({"FROM", "WHERE", "RETURNING", "ORDER", "LIMIT"})
+# Keywords that end the select list of a SELECT at the same nesting depth
+_SELECT_LIST_END = frozenset({
+    "FROM", "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "WINDOW", "UNION", "INTERSECT", "EXCEPT",
+})
+
+# SQLite renames duplicate result columns inside a derived table to "name:N"
+_DERIVED_DUPLICATE = re.compile(r"^(.*):\d+$")
+
+class SQLAnalysisError(ValueError):
+    pass
+
+@dataclass(frozen=True)
+class ColumnRef:
+    table: Optional[str]  # base table when known, None when unqualified or from a derived table
+    name: str             # "*" for SELECT * / alias.*
+
+@dataclass(frozen=True)
+class SQLAnalysis:
+    """Everything governance needs to know about one statement, from a single parse"""
+    fingerprint: str
+    statement_type: str
+    tables: Tuple[str, ...]
+    target: Optional[str]
+    aliases: Dict[str, str] = field(default_factory=dict)
+    columns: Tuple[ColumnRef, ...] = ()
+    predicate_columns: Tuple[ColumnRef, ...] = ()
+    predicates: Tuple[str, ...] = ()
+    set_columns: Tuple[str, ...] = ()
+    # Every reference except a plain `col`, `t.col` or `*` entry in the outermost
+    # select list: conditions, expressions, aliases, ordering, grouping, subqueries
+    indirect_columns: Tuple[ColumnRef, ...] = ()
+    row_count_sql: Optional[str] = None  # UPDATE only: a SELECT counting the rows it would modify
+
+    def expand_columns(self, schema: dict = None, refs: Tuple[ColumnRef, ...] = None) -> List[ColumnRef]:
+        """Referenced columns with `*` expanded and unqualified names resolved from the schema"""
+        tables = {name.lower(): (name, cols) for name, cols in (schema or {}).items()}
+        expanded = []
+        for ref in self.columns if refs is None else refs:
+            if ref.name == "*":
+                targets = [ref.table] if ref.table else list(self.tables)
+                for table in targets:
+                    name, cols = tables.get(table.lower(), (table, {}))
+                    expanded.extend(ColumnRef(name, col) for col in cols)
+                if not any(tables.get(t.lower()) for t in targets):
+                    expanded.append(ref)
+                continue
+            if ref.table is None and tables:
+                owners = [tables[t.lower()][0] for t in self.tables
+                          if t.lower() in tables and ref.name in tables[t.lower()][1]]
+                if len(owners) == 1:
+                    ref = ColumnRef(owners[0], ref.name)
+            expanded.append(ref)
+        return list(dict.fromkeys(expanded))
+
+    def column_names(self, schema: dict = None) -> List[str]:
+        return list(dict.fromkeys(ref.name for ref in self.expand_columns(schema)))
+
+    def predicate_column_names(self, schema: dict = None) -> List[str]:
+        return list(dict.fromkeys(ref.name for ref in self.expand_columns(schema, self.predicate_columns)))
+
+    def indirect_column_names(self, schema: dict = None) -> List[str]:
+        return list(dict.fromkeys(ref.name for ref in self.expand_columns(schema, self.indirect_columns)))
+
+def tokenize(sql: str) -> List[Tuple[str, str]]:
+    tokens, pos = [], 0
+    while pos < len(sql):
+        match = _TOKEN.match(sql, pos)
+        if match is None:
+            raise SQLAnalysisError(f"Unexpected character {sql[pos]!r} at offset {pos}")
+        kind = match.lastgroup
+        if kind not in ("space", "comment"):
+            tokens.append((kind, match.group()))
+        pos = match.end()
+    while tokens and tokens[-1] == ("op", ";"):
+        tokens.pop()
+    return tokens
+
+def statement_body(sql: str) -> str:
+    """`sql` up to its last significant token: trailing semicolons, whitespace and
+    comments are dropped, so the statement can be wrapped as `(...)` without a
+    trailing `--` comment swallowing the closing parenthesis"""
+    end = pos = 0
+    while pos < len(sql):
+        match = _TOKEN.match(sql, pos)
+        if match is None:
+            return sql.strip().rstrip(";").strip()
+        if match.lastgroup not in ("space", "comment") and match.group() != ";":
+            end = match.end()
+        pos = match.end()
+    return sql[:end].strip()
+
+def fingerprint(tokens: List[Tuple[str, str]]) -> str:
+    """Stable across whitespace, comments and keyword case; identifiers and literals are kept"""
+    canonical = "\x1f".join(
+        text.upper() if kind == "word" and text.upper() in KEYWORDS else text
+        for kind, text in tokens
+    )
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+def _identifier(token: Tuple[str, str]) -> Optional[str]:
+    kind, text = token
+    if kind == "ident":
+        return text[1:-1].replace('""', '"') if text[0] == '"' else text[1:-1]
+    if kind == "word" and text.upper() not in KEYWORDS:
+        return text
+    return None
+
+def _render(tokens: List[Tuple[str, str]]) -> str:
+    out = []
+    for i, (_, text) in enumerate(tokens):
+        if out and text not in (".", ",", ")") and tokens[i - 1][1] not in (".", "("):
+            if not (text == "(" and _identifier(tokens[i - 1]) is not None):  # function call
+                out.append(" ")
+        out.append(text)
+    return "".join(out)
+
+class _Parser:
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.upper = [text.upper() if kind == "word" else None for kind, text in tokens]
+        self.depth, self.match = [], {}
+        stack, depth = [], 0
+        for i, (kind, text) in enumerate(tokens):
+            if kind == "op" and text == "(":
+                stack.append(i)
+                depth += 1
+            self.depth.append(depth)
+            if kind == "op" and text == ")":
+                if not stack:
+                    raise SQLAnalysisError("Unbalanced parentheses")
+                self.match[stack.pop()] = i
+                depth -= 1
+        if stack:
+            raise SQLAnalysisError("Unbalanced parentheses")
+        self.claimed = set()
+        self.tables = []
+        self.aliases = {}
+        self.virtual = set()  # CTE names and derived-table aliases, upper-cased
+
+    def is_op(self, i: int, text: str) -> bool:
+        return i < len(self.tokens) and self.tokens[i] == ("op", text)
+
+    def word(self, i: int) -> Optional[str]:
+        return self.upper[i] if i < len(self.tokens) else None
+
+    def statement_type(self) -> str:
+        for i, keyword in enumerate(self.upper):
+            if keyword in STATEMENT_TYPES and self.depth[i] == 0:
+                return keyword
+        if self.upper and self.upper[0]:
+            return self.upper[0]
+        raise SQLAnalysisError("Empty statement")
+
+    def collect_ctes(self) -> None:
+        if self.word(0) != "WITH":
+            return
+        i = 2 if self.word(1) == "RECURSIVE" else 1
+        while i < len(self.tokens):
+            name = _identifier(self.tokens[i])
+            if name is None:
+                return
+            self.virtual.add(name.upper())
+            self.claimed.add(i)
+            i += 1
+            if self.is_op(i, "("):  # column list
+                self.claimed.update(range(i, self.match[i] + 1))
+                i = self.match[i] + 1
+            if self.word(i) != "AS":
+                return
+            i += 1
+            if self.word(i) == "NOT":
+                i += 1
+            if self.word(i) == "MATERIALIZED":
+                i += 1
+            if not self.is_op(i, "("):
+                return
+            i = self.match[i] + 1
+            if not self.is_op(i, ","):
+                return
+            i += 1
+
+    def read_alias(self, i: int) -> Tuple[Optional[str], int]:
+        if self.word(i) == "AS":
+            alias = _identifier(self.tokens[i + 1]) if i + 1 < len(self.tokens) else None
+            if alias is not None:
+                self.claimed.update((i, i + 1))
+                return alias, i + 2
+            return None, i
+        alias = _identifier(self.tokens[i]) if i < len(self.tokens) else None
+        if alias is not None:
+            self.claimed.add(i)
+            return alias, i + 1
+        return None, i
+
+    def read_table_list(self, i: int) -> Optional[int]:
+        """Record the table references starting at token i; returns the index after the first one"""
+        while i < len(self.tokens):
+            if self.is_op(i, "("):
+                end = self.match[i]
+                alias, i = self.read_alias(end + 1)
+                if alias:
+                    self.virtual.add(alias.upper())
+            else:
+                name = _identifier(self.tokens[i])
+                if name is None:
+                    return None
+                start = i
+                if self.is_op(i + 1, ".") and i + 2 < len(self.tokens) and _identifier(self.tokens[i + 2]):
+                    name = _identifier(self.tokens[i + 2])
+                    i += 2
+                if self.is_op(i + 1, "("):  # table-valued function such as json_each(...)
+                    return None
+                self.claimed.update(range(start, i + 1))
+                if name.upper() not in self.virtual:
+                    self.tables.append(name)
+                alias, i = self.read_alias(i + 1)
+                self.aliases[(alias or name).upper()] = name
+                self.aliases.setdefault(name.upper(), name)
+            if not self.is_op(i, ","):
+                return i
+            i += 1
+        return i
+
+    def collect_tables(self) -> Optional[str]:
+        target = None
+        for i, keyword in enumerate(self.upper):
+            if keyword in _TABLE_INTRODUCERS:
+                self.read_table_list(i + 1)
+            elif keyword == "UPDATE" and self.depth[i] == 0 and target is None:
+                j = i + 1
+                if self.word(j) == "OR":
+                    j += 2
+                before = len(self.tables)
+                self.read_table_list(j)
+                if len(self.tables) > before:
+                    target = self.tables[before]
+        return target
+
+    def predicate_ranges(self) -> List[Tuple[int, int]]:
+        ranges = []
+        for i, keyword in enumerate(self.upper):
+            if keyword not in _PREDICATE_KEYWORDS:
+                continue
+            if keyword == "ON" and self.word(i - 1) == "DO":  # upsert ON CONFLICT DO ...
+                continue
+            depth, end = self.depth[i], i + 1
+            while end < len(self.tokens):
+                if self.depth[end] < depth or (self.is_op(end, ")") and self.depth[end] == depth):
+                    break
+                if self.depth[end] == depth and self.upper[end] in _CLAUSE_BOUNDARIES:
+                    break
+                end += 1
+            if end > i + 1:
+                ranges.append((i + 1, end))
+        return ranges
+
+    def collect_set_columns(self) -> List[str]:
+        start = next((i + 1 for i, kw in enumerate(self.upper) if kw == "SET" and self.depth[i] == 0), None)
+        if start is None:
+            return []
+        columns, i, expect_target = [], start, True
+        while i < len(self.tokens):
+            if self.depth[i] == 0 and self.upper[i] in _UPDATE_SET_END:
+                break
+            if expect_target:
+                if self.is_op(i, "("):
+                    names = [j for j in range(i + 1, self.match[i]) if _identifier(self.tokens[j])]
+                else:
+                    names = [i] if _identifier(self.tokens[i]) else []
+                for j in names:
+                    columns.append(_identifier(self.tokens[j]))
+                    self.claimed.add(j)
+                expect_target = False
+            if self.is_op(i, "(") and i in self.match:
+                i = self.match[i] + 1
+                continue
+            if self.is_op(i, ",") and self.depth[i] == 0:
+                expect_target = True
+            i += 1
+        return columns
+
+    def direct_positions(self) -> set:
+        """Start tokens of the plain column references in the outermost select list"""
+        start = next((i + 1 for i, kw in enumerate(self.upper) if kw == "SELECT" and self.depth[i] == 0), None)
+        if start is None:
+            return set()
+        if self.word(start) in ("DISTINCT", "ALL"):
+            start += 1
+        end = start
+        while end < len(self.tokens) and not (self.depth[end] == 0 and self.upper[end] in _SELECT_LIST_END):
+            end += 1
+        positions, item = set(), start
+        for i in range(start, end + 1):
+            if i == end or (self.is_op(i, ",") and self.depth[i] == 0):
+                if self.is_plain_column(item, i):
+                    positions.add(item)
+                item = i + 1
+        return positions
+
+    def is_plain_column(self, start: int, end: int) -> bool:
+        """Whether tokens [start, end) are `col`, `t.col`, `*` or `t.*`, optionally aliased to the same name"""
+        name_at = start + 2 if self.is_op(start + 1, ".") else start
+        if name_at >= end or (name_at > start and _identifier(self.tokens[start]) is None):
+            return False
+        name = "*" if self.tokens[name_at] == ("op", "*") else _identifier(self.tokens[name_at])
+        if name is None or self.is_op(name_at + 1, "("):
+            return False
+        rest = name_at + 1
+        if rest == end:
+            return True
+        if self.word(rest) == "AS":
+            rest += 1
+        return rest == end - 1 and (_identifier(self.tokens[rest]) or "").upper() == name.upper()
+
+    def row_count_sql(self) -> Optional[str]:
+        """Rewrite an UPDATE into a SELECT counting the distinct target rows it would modify.
+
+        WITH, FROM, WHERE, ORDER BY and LIMIT are kept as written; RETURNING is dropped.
+        """
+        top = [i for i in range(len(self.tokens)) if self.depth[i] == 0]
+        update = next((i for i in top if self.upper[i] == "UPDATE"), None)
+        set_at = next((i for i in top if self.upper[i] == "SET"), None)
+        if update is None or set_at is None:
+            return None
+        start = update + 3 if self.word(update + 1) == "OR" else update + 1
+        target = self.tokens[start:set_at]
+        name_end = 3 if len(target) >= 3 and target[1] == ("op", ".") else 1
+        if not target or _identifier(target[name_end - 1]) is None:
+            return None
+        rest = target[name_end:]
+        if rest[:1] and rest[0][1].upper() == "AS":
+            rest = rest[1:]
+        row_ref = rest[0] if rest and _identifier(rest[0]) is not None else target[name_end - 1]
+
+        clauses = {self.upper[i]: i for i in reversed(top) if i > set_at and self.upper[i] in _UPDATE_SET_END}
+        bounds = sorted(clauses.values()) + [len(self.tokens)]
+
+        def clause(keyword: str) -> List[Tuple[str, str]]:
+            if keyword not in clauses:
+                return []
+            begin = clauses[keyword]
+            return self.tokens[begin:next(b for b in bounds if b > begin)]
+
+        select = [("word", "SELECT"), ("word", "DISTINCT"), row_ref, ("op", "."), ("word", "rowid"),
+                  ("word", "FROM")] + target
+        from_list = clause("FROM")[1:]
+        if from_list:
+            select += [("op", ",")] + from_list
+        select += clause("WHERE") + clause("ORDER") + clause("LIMIT")
+        return _render(self.tokens[:update] + [("word", "SELECT"), ("word", "COUNT"), ("op", "("), ("op", "*"),
+                                                ("op", ")"), ("word", "FROM"), ("op", "(")] + select + [("op", ")")])
+
+    def resolve(self, qualifier: Optional[str]) -> Optional[str]:
+        if qualifier is None:
+            real = [t for t in self.tables]
+            return real[0] if len(set(t.lower() for t in real)) == 1 and not self.virtual else None
+        if qualifier.upper() in self.virtual:
+            return None
+        return self.aliases.get(qualifier.upper(), qualifier)
+
+    def collect_columns(self, in_predicate: List[bool],
+                        direct: set) -> Tuple[List[ColumnRef], List[ColumnRef], List[ColumnRef]]:
+        columns, output_aliases = [], set()
+        tokens = self.tokens
+        for i in range(len(tokens)):
+            if i in self.claimed:
+                continue
+            kind, text = tokens[i]
+            ref = None
+            if kind == "op" and text == "*":
+                prev = self.upper[i - 1] if i else None
+                if prev in ("SELECT", "DISTINCT", "ALL") or (i and tokens[i - 1] == ("op", ",")
+                                                             and not in_predicate[i]):
+                    ref = ColumnRef(None, "*")
+            name = _identifier(tokens[i])
+            if ref is None and name is None:
+                continue
+            if ref is None:
+                if self.is_op(i + 1, "(") or self.is_op(i + 1, "."):
+                    # function call, or the qualifier of a qualified reference handled below
+                    if self.is_op(i + 1, ".") and i + 2 < len(tokens):
+                        self.claimed.add(i + 2)
+                        column = "*" if tokens[i + 2] == ("op", "*") else _identifier(tokens[i + 2])
+                        if column is not None:
+                            ref = ColumnRef(self.resolve(name), column)
+                    if ref is None:
+                        continue
+                elif i and self.upper[i - 1] == "AS":
+                    output_aliases.add(name.upper())
+                    continue
+                elif i and (tokens[i - 1][0] in ("ident", "string", "number")
+                            or _identifier(tokens[i - 1]) is not None or tokens[i - 1] == ("op", ")")):
+                    # bare alias directly after an expression
+                    output_aliases.add(name.upper())
+                    continue
+                else:
+                    ref = ColumnRef(self.resolve(None), name)
+            columns.append((i, ref))
+        columns = [(i, ref) for i, ref in columns if ref.table is not None or ref.name.upper() not in output_aliases]
+        refs = [ref for i, ref in columns]
+        predicate_refs = [ref for i, ref in columns if in_predicate[i] and ref.name != "*"]
+        indirect_refs = [ref for i, ref in columns if i not in direct]
+        return list(dict.fromkeys(refs)), list(dict.fromkeys(predicate_refs)), list(dict.fromkeys(indirect_refs))
+
+    def parse(self, fp: str) -> SQLAnalysis:
+        statement_type = self.statement_type()
+        self.collect_ctes()
+        target = self.collect_tables()
+        set_columns = self.collect_set_columns() if statement_type == "UPDATE" else []
+        ranges = self.predicate_ranges()
+        in_predicate = [False] * len(self.tokens)
+        for start, end in ranges:
+            for i in range(start, end):
+                in_predicate[i] = True
+        direct = self.direct_positions() if statement_type == "SELECT" else set()
+        columns, predicate_columns, indirect_columns = self.collect_columns(in_predicate, direct)
+        if target is not None:
+            columns = [ColumnRef(target, name) for name in set_columns] + columns
+        return SQLAnalysis(
+            fingerprint=fp,
+            statement_type=statement_type,
+            tables=tuple(dict.fromkeys(self.tables)),
+            target=target,
+            aliases={alias: table for alias, table in self.aliases.items() if alias not in self.virtual},
+            columns=tuple(dict.fromkeys(columns)),
+            predicate_columns=tuple(predicate_columns),
+            predicates=tuple(_render(self.tokens[start:end]) for start, end in ranges),
+            set_columns=tuple(set_columns),
+            indirect_columns=tuple(indirect_columns),
+            row_count_sql=self.row_count_sql() if statement_type == "UPDATE" else None,
+        )
+
+def derived_column_names(names: List[str]) -> List[str]:
+    """Result column names of a SELECT read back from it as a derived table, with the
+    `name:N` renaming of duplicates undone"""
+    columns = []
+    for name in names:
+        duplicate = _DERIVED_DUPLICATE.match(name)
+        columns.append(duplicate.group(1) if duplicate and duplicate.group(1) in columns else name)
+    return columns
+
+class SQLAnalysisCache:
+    """LRU of analyses keyed by raw text and by token fingerprint.
+
+    Exact repeats skip tokenizing; reformatted repeats (whitespace, comments,
+    keyword case) tokenize once but share the parsed analysis.
+    """
+
+    def __init__(self, max_entries: int = SQL_ANALYSIS_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _get(self, key):
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is not None:
+                self._entries.move_to_end(key)
+            return analysis
+
+    def _put(self, key, analysis: SQLAnalysis) -> None:
+        with self._lock:
+            self._entries[key] = analysis
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def analyze(self, sql: str) -> SQLAnalysis:
+        analysis = self._get(("sql", sql))
+        if analysis is None:
+            tokens = tokenize(sql)
+            fp = fingerprint(tokens)
+            analysis = self._get(("fp", fp))
+            if analysis is None:
+                with self._lock:
+                    self._misses += 1
+                analysis = _Parser(tokens).parse(fp)
+                self._put(("fp", fp), analysis)
+            self._put(("sql", sql), analysis)
+        else:
+            with self._lock:
+                self._hits += 1
+        return analysis
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self._hits, "misses": self._misses}
+
+analysis_cache = SQLAnalysisCache()
+
+def analyze_sql(sql: str) -> SQLAnalysis:
+    """Parse a statement once; later calls with the same text or fingerprint hit the cache"""
+    return analysis_cache.analyze(sql)
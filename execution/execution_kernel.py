@@ -1,99 +1,183 @@
-import time
-from core.sandbox.sandbox_manager import execute_query
-from core.audit_logger import log_audit
+from core.sandbox.sandbox_manager import (
+    execute_query,
+    execute_in_transaction,
+    execute_batch_in_transaction,
+    stream_query,
+    describe_query
+)
+from execution.query_rewriter import rewrite_select
+from execution.masking import masking_plan, sql_function
+from core.audit_logger import log_audit, log_audit_many
 from agentic.governance_orchestrator import GovernanceOrchestrator
+from agents.policy_compiler import compile_policy, mark_blocked_columns
+from agents.policy_store import PolicyStore, PolicyVersion
+from core.episodic_memory import DEFAULT_SESSION, EpisodicMemory
+
+CLASSIFICATION_SEVERITY = {"PUBLIC": 0, "PII": 1, "BLOCKED": 2}
+AUDIT_SOURCE = "kernel"
+
+def _allowed_reason(decision: dict, note: str = "Passed simulation and governance") -> str:
+    """Audit reason for an ALLOWED record: the governance verdict that let it through"""
+    verdict = decision.get("decision") or "ALLOW"
+    return f"{verdict}: {decision.get('explanation') or note}"
+
+def merge_simulations(simulations: list) -> dict:
+    """Union of several simulations, keeping the most severe classification per column"""
+    columns, tables, classification = {}, {}, {}
+    sources, source_classification, indirect = {}, {}, {}
+    rows_returned = rows_affected = 0
+
+    def keep_most_severe(merged: dict, classes: dict) -> None:
+        for col, kind in classes.items():
+            if CLASSIFICATION_SEVERITY.get(kind, 0) >= CLASSIFICATION_SEVERITY.get(merged.get(col), -1):
+                merged[col] = kind
+
+    for simulation in simulations:
+        for col in simulation.get("columns_accessed", []):
+            columns[col] = None
+        for table in simulation.get("tables_accessed", []):
+            tables[table] = None
+        for col in simulation.get("source_columns", []):
+            sources[col] = None
+        for col in simulation.get("indirect_columns", []):
+            indirect[col] = None
+        keep_most_severe(classification, simulation.get("column_classification", {}))
+        keep_most_severe(source_classification, simulation.get("source_classification", {}))
+        rows_returned += simulation.get("rows_returned", 0) or 0
+        rows_affected += simulation.get("rows_affected", 0) or 0
+
+    return {
+        "valid": True,
+        "query_type": "UPDATE" if any(s.get("query_type") == "UPDATE" for s in simulations) else "SELECT",
+        "tables_accessed": list(tables),
+        "columns_accessed": list(columns),
+        "column_classification": classification,
+        "source_columns": list(sources),
+        "source_classification": source_classification,
+        "indirect_columns": list(indirect),
+        "rows_returned": rows_returned,
+        "rows_affected": rows_affected
+    }
 
 class ExecutionKernel:
 
-    def __init__(self, policy: dict):
-        self.policy = policy
+    def __init__(self, policy, episodic_memory: EpisodicMemory = None):
+        # A plain policy dict gets a private in-memory store
+        self.policy_store = policy if isinstance(policy, PolicyStore) else PolicyStore.from_policy(policy)
         self.governance_orchestrator = GovernanceOrchestrator()
-        self.episodic_memory = []
+        self.episodic_memory = episodic_memory or EpisodicMemory()
 
-    def _deny_execution(self, sql: str, simulation: dict, reason: str, governance_result: dict = None) -> dict:
+    @property
+    def policy(self) -> dict:
+        return self.policy_store.active.policy
+
+    @property
+    def compiled_policy(self):
+        return self.policy_store.active.compiled
+
+    def _deny_execution(self, sql: str, simulation: dict, reason: str, governance_result: dict = None,
+                        active: PolicyVersion = None) -> dict:
+        active = active or self.policy_store.active
         log_audit(
             user_input=None,
             sql=sql,
             decision="DENIED",
             reason=reason,
-            simulation=simulation
+            simulation=simulation,
+            policy_version=active.version,
+            source=AUDIT_SOURCE
         )
         return {
             "status": "DENIED",
             "sql": sql,
             "simulation": simulation,
             "governance": governance_result,
-            "reason": reason
+            "reason": reason,
+            "policy_version": active.version
         }
 
-    def run_sql(self, sql: str, simulation: dict) -> dict:
-        if not simulation.get("valid", False):
-            return self._deny_execution(sql, simulation, "Simulation invalid")
-
-        self.episodic_memory.append({
-            "sql": sql,
-            "simulation": simulation,
-            "timestamp": time.time()
-        })
-        if len(self.episodic_memory) > 10:
-            self.episodic_memory = self.episodic_memory[-10:]
-
+    def _govern(self, sql: str, simulation: dict, session_id: str, active: PolicyVersion) -> dict:
+        entry = self.episodic_memory.remember(sql, simulation, session_id)
         governance_result = self.governance_orchestrator.run(
             sandbox_result=simulation,
-            policy=self.policy,
-            episodic_memory=self.episodic_memory
+            policy=active.policy,
+            episodic_memory=self.episodic_memory.session(session_id),
+            compiled_policy=active.compiled
         )
+        denied = governance_result.get("decision", {}).get("decision") == "DENY"
+        self.episodic_memory.resolve(entry, denied, session_id)
+        return governance_result
 
-        decision = governance_result.get("decision", {}).get("decision")
-        if decision == "DENY":
-            return self._deny_execution(sql, simulation, governance_result["decision"].get("explanation", "Governance denied execution"), governance_result)
+    def _rewrite_select(self, sql: str, decision: dict, simulation: dict, compiled):
+        cols_to_filter, cols_to_mask = [], {}
+        if decision.get("decision") in ("ALLOW_WITH_FILTERING", "ALLOW_WITH_MASKING"):
+            cols_to_filter = decision.get("columns_to_filter", [])
+        if decision.get("decision") == "ALLOW_WITH_MASKING":
+            plan = masking_plan(simulation, dict(compiled.masking))
+            cols_to_mask = {col: sql_function(strategy) for col, strategy in plan.items() if col not in cols_to_filter}
+        return rewrite_select(sql, cols_to_filter, compiled.max_rows, describe=describe_query,
+                              columns_to_mask=cols_to_mask)
 
-        query_result = execute_query(sql)
+    def _execute_select(self, sql: str, decision: dict, simulation: dict, compiled) -> dict:
+        rewritten, columns = self._rewrite_select(sql, decision, simulation, compiled)
+        if columns == []:
+            return {"columns": [], "rows": []}
+        return execute_query(rewritten)
 
-        rows = query_result.get("rows", [])
-        columns = query_result.get("columns", simulation.get("columns_accessed", []))
+    def run_sql(self, sql: str, simulation: dict, session_id: str = DEFAULT_SESSION) -> dict:
+        # One snapshot for the whole request, however often the policy changes meanwhile
+        active = self.policy_store.active
+        if not simulation.get("valid", False):
+            return self._deny_execution(sql, simulation, "Simulation invalid", active=active)
 
-        max_rows = self.policy.get("max_rows")
-        if max_rows and len(rows) > max_rows:
-            rows = rows[:max_rows]
+        governance_result = self._govern(sql, simulation, session_id, active)
 
-        if decision == "ALLOW_WITH_FILTERING":
-            if simulation.get("query_type") == "UPDATE":
+        decision = governance_result.get("decision", {}).get("decision")
+        if decision == "DENY":
+            return self._deny_execution(sql, simulation, governance_result["decision"].get("explanation", "Governance denied execution"), governance_result, active)
+
+        if simulation.get("query_type") == "UPDATE":
+            if decision == "ALLOW_WITH_FILTERING":
                 log_audit(
                     user_input=None,
                     sql=sql,
                     decision="DENIED",
                     reason="UPDATE operations cannot be filtered",
-                    simulation=simulation
+                    simulation=simulation,
+                    policy_version=active.version,
+                    source=AUDIT_SOURCE
                 )
                 return {
                     "status": "DENIED",
                     "sql": sql,
                     "simulation": simulation,
                     "governance": governance_result,
-                    "message": "UPDATE operations cannot be filtered"
+                    "message": "UPDATE operations cannot be filtered",
+                    "policy_version": active.version
                 }
 
-            cols_to_filter = set(governance_result["decision"].get("columns_to_filter", []))
-            if cols_to_filter and columns:
-                keep_indices = [i for i, col in enumerate(columns) if col not in cols_to_filter]
-                columns = [columns[i] for i in keep_indices]
-                filtered_rows = []
-                for row in rows:
-                    filtered_row = [row[i] for i in keep_indices]
-                    filtered_rows.append(filtered_row)
-                rows = filtered_rows
-
-        if simulation.get("query_type") == "UPDATE":
-            update_result = execute_query(sql)
+            # Governance approved the row count the simulation saw; the single
+            # execution commits only if the live statement stays within it
+            simulated_rows = simulation.get("rows_affected")
+            update_result = execute_in_transaction(
+                sql,
+                approve=lambda affected: simulated_rows is None or affected <= simulated_rows
+            )
             affected_rows = update_result.get("affected_rows", 0)
 
+            if not update_result["committed"]:
+                reason = (f"UPDATE would modify {affected_rows} rows but governance approved "
+                          f"{simulated_rows}; rolled back")
+                return self._deny_execution(sql, simulation, reason, governance_result, active)
+
             log_audit(
                 user_input=None,
                 sql=sql,
                 decision="ALLOWED",
                 reason="Passed simulation and governance",
-                simulation=simulation
+                simulation=simulation,
+                policy_version=active.version,
+                source=AUDIT_SOURCE
             )
 
             return {
@@ -105,28 +189,235 @@ class ExecutionKernel:
                     "operation": "UPDATE",
                     "rows_affected": affected_rows
                 },
-                "message": f"UPDATE operation completed successfully. {affected_rows} rows affected."
+                "message": f"UPDATE operation completed successfully. {affected_rows} rows affected.",
+                "policy_version": active.version
             }
 
+        # max_rows, blocked-column filtering and PII masking are applied by SQLite itself
+        query_result = self._execute_select(sql, governance_result["decision"], simulation, active.compiled)
+        rows = query_result.get("rows", [])
+        columns = query_result.get("columns", simulation.get("columns_accessed", []))
+
+        data = {
+            "columns": columns,
+            "rows": rows
+        }
+
+        log_audit(
+            user_input=None,
+            sql=sql,
+            decision="ALLOWED",
+            reason="Passed simulation and governance",
+            simulation=simulation,
+            policy_version=active.version,
+            source=AUDIT_SOURCE
+        )
+
+        return {
+            "status": "ALLOWED",
+            "sql": sql,
+            "simulation": simulation,
+            "governance": governance_result,
+            "data": data,
+            "message": "Query approved after simulation",
+            "policy_version": active.version
+        }
+
+    def dry_run(self, sql: str, simulation: dict, policy=None) -> dict:
+        """What run_sql would decide under `policy` (default: the active one), without running anything.
+
+        Nothing is executed, audited or remembered and no LLM enrichment is
+        queued; the shared orchestrator and its decision memo serve any policy.
+        """
+        compiled = compile_policy(policy) if policy is not None else self.policy_store.active.compiled
+        if not simulation.get("valid", False):
+            return {"status": "DENIED", "sql": sql, "reason": "Simulation invalid", "decision": None,
+                    "columns_filtered": [], "columns_masked": [], "columns_returned": [], "projected_rows": 0}
+
+        simulation = mark_blocked_columns(simulation, compiled)
+        governance_result = self.governance_orchestrator.run(
+            sandbox_result=simulation,
+            policy=policy if isinstance(policy, dict) else compiled.to_dict(),
+            compiled_policy=compiled,
+            enrich=False
+        )
+        decision = governance_result["decision"]
+        verdict = decision.get("decision")
+        query_type = simulation.get("query_type")
+
+        filtered = list(decision.get("columns_to_filter", [])) if verdict != "DENY" else []
+        masked = sorted(set(masking_plan(simulation, dict(compiled.masking))) - set(filtered)) \
+            if verdict == "ALLOW_WITH_MASKING" else []
+        reason = decision.get("explanation", "")
+        if verdict == "DENY" or (query_type == "UPDATE" and filtered):
+            status, projected = "DENIED", 0
+            if verdict != "DENY":
+                reason = "UPDATE operations cannot be filtered"
+        elif query_type == "UPDATE":
+            status, projected = "ALLOWED", simulation.get("rows_affected", 0) or 0
         else:
-            data = {
-                "columns": columns,
-                "rows": rows
-            }
+            status, projected = "ALLOWED", simulation.get("rows_returned", 0) or 0
+            if compiled.max_rows is not None:
+                projected = min(projected, compiled.max_rows)
+
+        returned = [col for col in simulation.get("columns_accessed", []) if col not in filtered]
+        return {
+            "status": status,
+            "sql": sql,
+            "reason": reason,
+            "decision": verdict,
+            "columns_filtered": filtered,
+            "columns_masked": masked,
+            "columns_returned": returned if status == "ALLOWED" else [],
+            "projected_rows": projected,
+            "governance": governance_result
+        }
+
+    def run_sql_stream(self, sql: str, simulation: dict, user_input: str = None, session_id: str = DEFAULT_SESSION):
+        """Govern a SELECT and return (envelope, batches).
+
+        `batches` lazily yields lists of rows from the rewritten query (blocked
+        columns projected away, `max_rows` as a LIMIT), so memory stays flat
+        whatever the result size. It is None when execution was denied; the
+        envelope then explains why.
+        """
+        active = self.policy_store.active
+        if not simulation.get("valid", False):
+            return self._deny_execution(sql, simulation, "Simulation invalid", active=active), None
+        if simulation.get("query_type") != "SELECT":
+            return self._deny_execution(sql, simulation, "Only SELECT queries can be streamed", active=active), None
 
+        governance_result = self._govern(sql, simulation, session_id, active)
+
+        decision = governance_result.get("decision", {}).get("decision")
+        if decision == "DENY":
+            return self._deny_execution(sql, simulation, governance_result["decision"].get("explanation", "Governance denied execution"), governance_result, active), None
+
+        # Audited only once the query has actually started, so a failing
+        # statement never leaves an ALLOWED record behind
+        try:
+            rewritten, kept = self._rewrite_select(sql, governance_result["decision"], simulation, active.compiled)
+            if kept == []:
+                columns, batches = [], (rows for rows in ())
+            else:
+                batches = stream_query(rewritten)
+                columns = next(batches)
+        except Exception as e:
             log_audit(
-                user_input=None,
+                user_input=user_input,
                 sql=sql,
-                decision="ALLOWED",
-                reason="Passed simulation and governance",
-                simulation=simulation
+                decision="DENIED",
+                reason=f"Execution error: {e}",
+                simulation=simulation,
+                policy_version=active.version,
+                source=AUDIT_SOURCE
             )
+            raise
 
-            return {
-                "status": "ALLOWED",
-                "sql": sql,
-                "simulation": simulation,
-                "governance": governance_result,
-                "data": data,
-                "message": "Query approved after simulation"
-            }
\ No newline at end of file
+        log_audit(
+            user_input=user_input,
+            sql=sql,
+            decision="ALLOWED",
+            reason=_allowed_reason(governance_result["decision"], "Passed simulation and governance (streamed)"),
+            simulation=simulation,
+            policy_version=active.version,
+            source=AUDIT_SOURCE
+        )
+
+        envelope = {
+            "status": "ALLOWED",
+            "sql": sql,
+            "simulation": simulation,
+            "governance": governance_result,
+            "columns": columns,
+            "policy_version": active.version
+        }
+        return envelope, batches
+
+    def run_batch(self, statements: list, user_input: str = None, session_id: str = DEFAULT_SESSION) -> dict:
+        """Govern and execute several (sql, simulation) pairs together.
+
+        Risk and remediation are assessed once over the union of everything the
+        batch touches; each statement still gets its own policy decision. Allowed
+        statements run in one transaction (one savepoint each) and all audit
+        records are queued in a single call.
+        """
+        active = self.policy_store.active
+        results = [None] * len(statements)
+        audits = []
+
+        def deny(index, sql, simulation, reason, decision=None):
+            results[index] = {"index": index, "sql": sql, "status": "DENIED", "decision": decision, "reason": reason}
+            audits.append({"user_input": user_input, "sql": sql, "decision": "DENIED", "reason": reason, "simulation": simulation})
+
+        valid, entries = [], {}
+        for index, (sql, simulation) in enumerate(statements):
+            if simulation.get("valid", False):
+                valid.append((index, sql, simulation))
+                entries[index] = self.episodic_memory.remember(sql, simulation, session_id)
+            else:
+                deny(index, sql, simulation, "Simulation invalid")
+
+        governance_result = None
+        if valid:
+            governance_result = self.governance_orchestrator.run(
+                sandbox_result=merge_simulations([simulation for _, _, simulation in valid]),
+                policy=active.policy,
+                episodic_memory=self.episodic_memory.session(session_id),
+                compiled_policy=active.compiled
+            )
+
+        pending = []
+        for index, sql, simulation in valid:
+            decision = self.governance_orchestrator.decide(simulation, active.compiled)
+            verdict = decision.get("decision")
+            self.episodic_memory.resolve(entries[index], verdict == "DENY", session_id)
+            if verdict == "DENY":
+                deny(index, sql, simulation, decision.get("explanation", "Governance denied execution"), decision)
+            elif simulation.get("query_type") == "UPDATE":
+                if verdict == "ALLOW_WITH_FILTERING":
+                    deny(index, sql, simulation, "UPDATE operations cannot be filtered", decision)
+                    continue
+                simulated_rows = simulation.get("rows_affected")
+                approve = lambda affected, limit=simulated_rows: limit is None or affected <= limit
+                pending.append((index, sql, simulation, decision, sql, approve))
+            else:
+                rewritten, kept = self._rewrite_select(sql, decision, simulation, active.compiled)
+                if kept == []:
+                    results[index] = {"index": index, "sql": sql, "status": "ALLOWED", "decision": decision,
+                                      "data": {"columns": [], "rows": []}}
+                    audits.append({"user_input": user_input, "sql": sql, "decision": "ALLOWED",
+                                   "reason": _allowed_reason(decision), "simulation": simulation})
+                    continue
+                pending.append((index, sql, simulation, decision, rewritten, None))
+
+        outcomes = execute_batch_in_transaction(
+            [(executed, approve) for *_, executed, approve in pending],
+            writes=any(approve is not None for *_, approve in pending)
+        )
+        for (index, sql, simulation, decision, _, _), outcome in zip(pending, outcomes):
+            if "error" in outcome:
+                results[index] = {"index": index, "sql": sql, "status": "ERROR", "decision": decision, "reason": outcome["error"]}
+                audits.append({"user_input": user_input, "sql": sql, "decision": "DENIED",
+                               "reason": f"Execution error: {outcome['error']}", "simulation": simulation})
+            elif not outcome["committed"]:
+                deny(index, sql, simulation,
+                     f"UPDATE would modify {outcome['affected_rows']} rows but governance approved "
+                     f"{simulation.get('rows_affected')}; rolled back", decision)
+            else:
+                outcome.pop("committed")
+                if "affected_rows" in outcome:
+                    outcome["rows_affected"] = outcome.pop("affected_rows")
+                results[index] = {"index": index, "sql": sql, "status": "ALLOWED", "decision": decision, "data": outcome}
+                audits.append({"user_input": user_input, "sql": sql, "decision": "ALLOWED",
+                               "reason": _allowed_reason(decision), "simulation": simulation})
+
+        log_audit_many([dict(audit, policy_version=active.version, source=AUDIT_SOURCE) for audit in audits])
+        return {
+            "status": "COMPLETED",
+            "governance": governance_result,
+            "policy_version": active.version,
+            "allowed": sum(1 for result in results if result["status"] == "ALLOWED"),
+            "denied": sum(1 for result in results if result["status"] == "DENIED"),
+            "results": results
+        }
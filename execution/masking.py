@@ -0,0 +1,81 @@
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+from typing import Dict
+from core.connection_pool import register_connection_hook
+
+logger = logging.getLogger(__name__)
+
+def _masking_secret() -> bytes:
+    configured = os.getenv("MASKING_SECRET")
+    if configured:
+        return configured.encode()
+    # Without a configured key, hashes and tokens are only stable within this process
+    logger.warning("MASKING_SECRET is not set; using a random per-process masking key")
+    return secrets.token_bytes(32)
+
+MASKING_SECRET = _masking_secret()
+PARTIAL_REVEAL = int(os.getenv("MASKING_PARTIAL_REVEAL", "4"))
+REDACTED = "[REDACTED]"
+
+# Strategy per column classification unless the policy's "masking" map overrides it
+DEFAULT_STRATEGIES = {"PII": "partial", "BLOCKED": "redact"}
+
+def mask_redact(value):
+    return None if value is None else REDACTED
+
+def _keyed_digest(domain: bytes, value) -> str:
+    return hmac.new(MASKING_SECRET, domain + str(value).encode(), hashlib.sha256).hexdigest()[:16]
+
+def mask_hash(value):
+    if value is None:
+        return None
+    return _keyed_digest(b"", value)
+
+def mask_partial(value):
+    if value is None:
+        return None
+    text = str(value)
+    reveal = min(PARTIAL_REVEAL, len(text) // 2)
+    return "*" * (len(text) - reveal) + (text[-reveal:] if reveal else "")
+
+def mask_tokenize(value):
+    """Stable token per value, derived from the masking key so nothing is stored to look it up"""
+    if value is None:
+        return None
+    return f"TKN-{_keyed_digest(b'token:', value)}"
+
+STRATEGIES = {
+    "redact": mask_redact,
+    "hash": mask_hash,
+    "partial": mask_partial,
+    "tokenize": mask_tokenize,
+}
+
+def sql_function(strategy: str) -> str:
+    return f"mask_{strategy}"
+
+def _register_masking_functions(conn) -> None:
+    for strategy, fn in STRATEGIES.items():
+        conn.create_function(sql_function(strategy), 1, fn, deterministic=True)
+
+register_connection_hook(_register_masking_functions)
+
+def masking_plan(simulation: dict, policy_masking: Dict[str, str] = None, classes=("PII",)) -> Dict[str, str]:
+    """Map each column that needs masking to a strategy.
+
+    `policy_masking` may name a strategy per column or per classification;
+    column entries win, then classification entries, then DEFAULT_STRATEGIES.
+    """
+    overrides = policy_masking or {}
+    plan = {}
+    for col, kind in simulation.get("column_classification", {}).items():
+        if kind not in classes:
+            continue
+        strategy = overrides.get(col) or overrides.get(kind) or DEFAULT_STRATEGIES.get(kind, "redact")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown masking strategy: {strategy}")
+        plan[col] = strategy
+    return plan
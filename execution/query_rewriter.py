@@ -0,0 +1,53 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from core.sql_analysis import derived_column_names, statement_body
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def rewrite_select(sql: str, columns_to_filter: Iterable[str] = (), max_rows: Optional[int] = None,
+                   describe: Callable[[str], List[str]] = None,
+                   columns_to_mask: Dict[str, str] = None) -> Tuple[str, Optional[List[str]]]:
+    """Wrap an approved SELECT so SQLite drops filtered columns, masks sensitive
+    ones and stops at max_rows.
+
+    Returns the SQL to execute and the columns it will produce (None when the
+    projection is unchanged). `describe` returns the column names a SELECT has
+    as a derived table, without reading rows. Those names are unique (SQLite
+    renames a duplicate `id` to `id:1`), so projection uses them and aliases
+    duplicates back to their original name. `columns_to_mask` maps a column to
+    the SQL function (registered on every pooled connection) that masks it. If
+    every column is filtered the projection is empty and the caller should not
+    execute the query.
+    """
+    blocked = set(columns_to_filter or ())
+    masks = columns_to_mask or {}
+    statement = statement_body(sql)
+    projection, kept = "*", None
+
+    if (blocked or masks) and describe is None:
+        raise ValueError("Filtering or masking columns requires a describe callable")
+    # A bare LIMIT wrapper would also expose SQLite's "id:1" renaming, so it gets names too
+    if describe is not None and (blocked or masks or max_rows):
+        names = describe(statement)
+        columns = derived_column_names(names)
+        keep = [i for i, col in enumerate(columns) if col not in blocked]
+        masked = any(columns[i] in masks for i in keep)
+        if len(keep) < len(columns) or masked or columns != names:
+            selected = []
+            for i in keep:
+                expression = quote_identifier(names[i])
+                if columns[i] in masks:
+                    expression = f"{masks[columns[i]]}({expression})"
+                if expression != quote_identifier(columns[i]):
+                    expression += f" AS {quote_identifier(columns[i])}"
+                selected.append(expression)
+            projection = ", ".join(selected)
+            kept = [columns[i] for i in keep]
+
+    if projection == "*" and not max_rows:
+        return sql, kept
+
+    rewritten = f"SELECT {projection or 'NULL'} FROM ({statement})"
+    if max_rows:
+        rewritten += f" LIMIT {int(max_rows)}"
+    return rewritten, kept
@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Point every module-level database path at a generated scratch copy before
+# anything under test is imported
+_scratch = tempfile.mkdtemp(prefix="governance-tests-")
+os.environ.setdefault("APP_DB_PATH", os.path.join(_scratch, "app.db"))
+os.environ.setdefault("AUDIT_DB_PATH", os.path.join(_scratch, "audit.db"))
+os.environ.setdefault("EPISODIC_DB_PATH", os.path.join(_scratch, "episodic.db"))
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("AUDIT_SYNCHRONOUS", "1")
+os.environ.pop("RISK_LLM_ENRICHMENT", None)
+
+from benchmarks.datagen import generate  # noqa: E402
+
+generate(os.environ["APP_DB_PATH"], 2000, seed=0)
+
+from core.audit_logger import init_db  # noqa: E402
+
+init_db()
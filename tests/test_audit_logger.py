@@ -0,0 +1,54 @@
+import os
+import sqlite3
+
+from core.audit_logger import AuditWriter, DB_PATH, _audit_record
+
+def _count(sql: str) -> int:
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute("SELECT COUNT(*) FROM audit_logs WHERE sql = ?", (sql,)).fetchone()[0]
+
+def test_failed_batch_is_retried_until_written():
+    writer = AuditWriter(synchronous=False, retry_backoff=0.001)
+    write, failures = writer._write, []
+
+    def flaky_write(records):
+        if len(failures) < 3:
+            failures.append(len(records))
+            raise sqlite3.OperationalError("database is locked")
+        write(records)
+
+    writer._write = flaky_write
+    sql = "SELECT 'retried audit batch'"
+    writer.submit_many([_audit_record("test", sql, "ALLOWED", "retry", {}) for _ in range(5)])
+    writer.flush()
+    writer.close()
+    assert len(failures) == 3
+    assert _count(sql) == 5
+
+def test_permanently_failing_batch_is_spilled_and_worker_moves_on():
+    writer = AuditWriter(synchronous=False, retry_backoff=0.001, max_retries=3)
+    write, attempts = writer._write, []
+    bad_sql, good_sql = "SELECT 'unwritable audit batch'", "SELECT 'audit batch after a bad one'"
+
+    def failing_write(records):
+        if any(record[2] == bad_sql for record in records):
+            attempts.append(len(records))
+            raise sqlite3.OperationalError("disk I/O error")
+        write(records)
+
+    writer._write = failing_write
+    spill = f"{writer.db_path}.unwritten.jsonl"
+    writer.submit(_audit_record("test", bad_sql, "ALLOWED", "spill", {}))
+    writer.flush()
+    writer.submit(_audit_record("test", good_sql, "ALLOWED", "after spill", {}))
+    writer.flush()
+    writer.close()
+    try:
+        with open(spill) as f:
+            spilled = f.read()
+    finally:
+        os.remove(spill)
+    assert len(attempts) == 3
+    assert bad_sql in spilled
+    assert _count(bad_sql) == 0
+    assert _count(good_sql) == 1
@@ -0,0 +1,34 @@
+import sqlite3
+
+from core.sandbox.sandbox_manager import DB_PATH, execute_batch_in_transaction
+
+def test_empty_batch_opens_no_transaction():
+    assert execute_batch_in_transaction([]) == []
+
+def test_read_only_batch_does_not_take_the_write_lock():
+    execute_batch_in_transaction([("SELECT 1", None)], writes=False)  # open the pooled connection first
+    # Another connection holds the write lock for the whole batch
+    writer = sqlite3.connect(DB_PATH, timeout=0)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        results = execute_batch_in_transaction(
+            [("SELECT COUNT(*) FROM budgets", None), ("SELECT MAX(id) FROM vendors", None)], writes=False
+        )
+    finally:
+        writer.rollback()
+        writer.close()
+    assert [result["committed"] for result in results] == [True, True]
+    assert results[0]["rows"][0][0] > 0
+
+def test_batch_audit_records_use_allowed_and_denied():
+    from api.server import kernel, run_simulation
+    from core.audit_logger import DB_PATH as AUDIT_DB_PATH
+
+    sql = "SELECT id, category FROM budgets WHERE id < 3"
+    kernel.run_batch([(sql, run_simulation(sql)), ("SELECT nope", {"valid": False})], user_input="batch audit")
+    with sqlite3.connect(AUDIT_DB_PATH) as conn:
+        rows = conn.execute("SELECT sql, decision, reason FROM audit_logs WHERE user_input = 'batch audit' "
+                            "AND source = 'kernel' ORDER BY id").fetchall()
+    assert {row[1] for row in rows} == {"ALLOWED", "DENIED"}
+    allowed = next(row for row in rows if row[0] == sql)
+    assert allowed[1] == "ALLOWED" and allowed[2].startswith("ALLOW")
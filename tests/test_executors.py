@@ -0,0 +1,31 @@
+import asyncio
+import threading
+
+import pytest
+
+from api.executors import BoundedExecutor, Overloaded
+
+def test_cancelled_call_keeps_its_slot_until_the_worker_finishes():
+    executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+    started, finish = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        finish.wait(5)
+
+    async def scenario():
+        task = asyncio.ensure_future(executor.run(work))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert executor.stats()["in_flight"] == 1
+        with pytest.raises(Overloaded):
+            await executor.run(work)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        finish.set()
+        executor.shutdown()
+    assert executor.stats()["in_flight"] == 0
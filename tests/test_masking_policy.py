@@ -0,0 +1,38 @@
+from agents.governance_agents import GovernanceDecisionAgent
+from agents.policy_compiler import compile_policy, mark_blocked_columns
+from core.sandbox.sandbox_manager import SandboxManager
+from execution.execution_kernel import ExecutionKernel
+from core.episodic_memory import EpisodicMemory
+
+POLICY = {"mask_pii": True, "blocked_columns": ["balance"]}
+
+SCHEMA = {"accounts": ["id", "account_name", "account_type", "currency", "balance", "risk_level", "created_at"]}
+
+def _simulate(sql: str) -> dict:
+    sandbox = SandboxManager(SCHEMA)
+    try:
+        return mark_blocked_columns(sandbox.simulate_query(sql), compile_policy(POLICY))
+    finally:
+        sandbox.teardown()
+
+def test_masking_keeps_blocked_column_filter():
+    decision = GovernanceDecisionAgent().decide(
+        _simulate("SELECT account_name, balance FROM accounts"), compile_policy(POLICY)
+    )
+    assert decision["decision"] == "ALLOW_WITH_MASKING"
+    assert decision["columns_to_filter"] == ["balance"]
+
+def test_masking_keeps_blocked_predicate_deny():
+    decision = GovernanceDecisionAgent().decide(
+        _simulate("SELECT account_name FROM accounts WHERE balance > 100"), compile_policy(POLICY)
+    )
+    assert decision["decision"] == "DENY"
+
+def test_masked_result_drops_blocked_column():
+    sql = "SELECT account_name, balance FROM accounts"
+    kernel = ExecutionKernel(POLICY, EpisodicMemory(persist=False))
+    result = kernel.run_sql(sql, _simulate(sql))
+    assert result["status"] == "ALLOWED"
+    data = result["data"]
+    assert data["columns"] == ["account_name"]
+    assert data["rows"] and all(not row[0].startswith("Account ") for row in data["rows"])
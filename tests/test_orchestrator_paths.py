@@ -0,0 +1,60 @@
+"""The direct fast path and the LangGraph path must govern identically, sync and async."""
+import asyncio
+import random
+
+import pytest
+
+from agentic.governance_orchestrator import GovernanceOrchestrator
+from core.episodic_memory import SessionMemory
+
+COLUMNS = ["id", "vendor_name", "amount", "account_name", "country", "email"]
+CLASSES = ["PUBLIC", "PII", "BLOCKED"]
+POLICIES = [
+    {},
+    {"deny_pii": True},
+    {"mask_pii": True},
+    {"blocked_columns": ["amount"]},
+    {"allowed_tables": ["x"]},
+    {"blocked_columns": ["vendor_name", "country"], "max_rows": 10},
+]
+CASES = 200
+
+def _simulation(rng: random.Random) -> dict:
+    query_type = rng.choice(["SELECT", "SELECT", "UPDATE"])
+    columns = rng.sample(COLUMNS, rng.randint(1, len(COLUMNS)))
+    sources = rng.sample(COLUMNS, rng.randint(0, len(COLUMNS)))
+    simulation = {
+        "valid": True,
+        "query_type": query_type,
+        "tables_accessed": rng.sample(["accounts", "vendors", "transactions"], rng.randint(1, 3)),
+        "columns_accessed": columns,
+        "column_classification": {col: rng.choice(CLASSES) for col in columns},
+        "source_columns": sources,
+        "source_classification": {col: rng.choice(CLASSES) for col in sources},
+        "indirect_columns": [col for col in sources if rng.random() < 0.3],
+    }
+    if query_type == "UPDATE":
+        simulation["rows_affected"] = rng.choice([0, 1, 50, 5000])
+    else:
+        simulation["rows_returned"] = rng.choice([0, 1, 50, 5000, 200000])
+    return simulation
+
+def _memory(rng: random.Random) -> SessionMemory:
+    memory = SessionMemory("differential", window=rng.choice([1, 5, 20]))
+    for _ in range(rng.randint(0, 30)):
+        entry, _ = memory.append("SELECT 1", _simulation(rng))
+        if rng.random() < 0.8:
+            memory.resolve(entry, rng.random() < 0.3)
+    return memory
+
+@pytest.mark.parametrize("seed", range(5))
+def test_fast_path_matches_graph(seed):
+    rng = random.Random(seed)
+    direct, graph = GovernanceOrchestrator(fast_path=True), GovernanceOrchestrator(fast_path=False)
+    for _ in range(CASES // 5):
+        simulation, policy = _simulation(rng), rng.choice(POLICIES)
+        memory = _memory(rng) if rng.random() < 0.7 else None
+        expected = graph.run(simulation, policy, episodic_memory=memory)
+        assert direct.run(simulation, policy, episodic_memory=memory) == expected
+        assert asyncio.run(direct.arun(simulation, policy, episodic_memory=memory)) == expected
+        assert asyncio.run(graph.arun(simulation, policy, episodic_memory=memory)) == expected
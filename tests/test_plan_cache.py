@@ -0,0 +1,20 @@
+from agents.plan_cache import PlanCache, normalize_request
+
+SCHEMA_HINT = "accounts(id, account_name, balance)"
+
+def test_requests_differing_only_by_operator_do_not_collide():
+    cache = PlanCache()
+    cache.put("accounts with balance > 1000", SCHEMA_HINT, {"sql": "SELECT id FROM accounts WHERE balance > 1000"})
+    assert cache.get("accounts with balance < 1000", SCHEMA_HINT) is None
+    assert cache.get("accounts with balance >= 1000", SCHEMA_HINT) is None
+    assert cache.get("Accounts with  balance > 1000?", SCHEMA_HINT)["sql"].endswith("> 1000")
+
+def test_numbers_keep_sign_and_decimals():
+    assert normalize_request("balance > 10.5") != normalize_request("balance > 105")
+    assert normalize_request("balance > -5") != normalize_request("balance > 5")
+
+def test_paraphrase_must_repeat_operators():
+    cache = PlanCache(similarity_threshold=0.5)
+    cache.put("list accounts with balance > 1000", SCHEMA_HINT, {"sql": "gt"})
+    assert cache.get("show accounts where balance > 1000", SCHEMA_HINT) == {"sql": "gt"}
+    assert cache.get("show accounts where balance < 1000", SCHEMA_HINT) is None
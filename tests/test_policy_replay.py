@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+
+from agents.policy_replay import replay_policy
+from core.audit_logger import get_audit_writer, log_audit
+
+SIMULATION = {
+    "valid": True,
+    "query_type": "SELECT",
+    "tables_accessed": ["vendors"],
+    "columns_accessed": ["id", "vendor_name"],
+    "column_classification": {"id": "PUBLIC", "vendor_name": "PII"},
+}
+
+def test_replay_counts_each_governed_request_once():
+    since = datetime.now(timezone.utc).isoformat()
+    sql = "SELECT id, vendor_name FROM vendors"
+    # One /simulate flag, then one /execute: the kernel's decision and the API's summary of it
+    log_audit(user_input="q", sql=sql, decision="DENIED", reason="PII detected - blocked at UI level",
+              simulation=SIMULATION, source="simulation")
+    log_audit(user_input=None, sql=sql, decision="ALLOWED", reason="ok", simulation=SIMULATION, source="kernel")
+    log_audit(user_input="q", sql=sql, decision="ALLOWED", reason="ok", simulation=SIMULATION, source="api")
+    get_audit_writer().flush()
+
+    report = replay_policy({"deny_pii": True}, since=since, until=datetime.now(timezone.utc).isoformat(),
+                           baseline={})
+    assert report["records"] == 1
+    assert report["transitions"] == {"ALLOW->DENY": 1}
@@ -0,0 +1,17 @@
+from core.sandbox.sandbox_manager import describe_query, execute_query
+from execution.query_rewriter import rewrite_select
+
+JOIN = "SELECT t.id, v.id FROM transactions t JOIN vendors v ON v.id = t.vendor_id"
+
+def test_row_limit_keeps_duplicate_column_names():
+    rewritten, kept = rewrite_select(JOIN, max_rows=5, describe=describe_query)
+    result = execute_query(rewritten)
+    assert result["columns"] == ["id", "id"]
+    assert len(result["rows"]) == 5
+
+def test_trailing_comment_survives_wrapping():
+    rewritten, kept = rewrite_select("SELECT id, category FROM budgets; -- note", columns_to_filter=["category"],
+                                     max_rows=3, describe=describe_query)
+    result = execute_query(rewritten)
+    assert result["columns"] == ["id"]
+    assert len(result["rows"]) == 3
@@ -0,0 +1,18 @@
+from core.sandbox.simulation_cache import SimulationCache, bump_table_versions, version_snapshot
+
+SQL = "SELECT id FROM budgets"
+SIMULATION = {"valid": True, "query_type": "SELECT", "tables_accessed": ["budgets"], "columns_accessed": ["id"]}
+
+def test_entry_hits_until_its_table_is_written():
+    cache = SimulationCache()
+    cache.put(SQL, SIMULATION, "plan", version_snapshot())
+    assert cache.get(SQL, "plan") == SIMULATION
+    bump_table_versions(["budgets"])
+    assert cache.get(SQL, "plan") is None
+
+def test_write_during_simulation_invalidates_entry():
+    cache = SimulationCache()
+    versions = version_snapshot()
+    bump_table_versions(["budgets"])  # committed while the statement was being simulated
+    cache.put(SQL, SIMULATION, "plan", versions)
+    assert cache.get(SQL, "plan") is None
@@ -0,0 +1,74 @@
+import pytest
+
+from agents.governance_agents import GovernanceDecisionAgent, suggest_remediation
+from agents.risk_scorer import score_risk
+from agents.policy_compiler import compile_policy, mark_blocked_columns
+from core.episodic_memory import SessionMemory
+from core.sandbox.sandbox_manager import SandboxManager
+
+SCHEMA = {
+    "accounts": ["id", "account_name", "account_type", "currency", "balance", "risk_level", "created_at"],
+    "vendors": ["id", "vendor_name", "country", "is_blocked", "risk_score", "created_at"],
+    "transactions": ["id", "account_id", "vendor_id", "amount", "currency", "transaction_type", "category",
+                     "transaction_date", "approved_by"],
+}
+
+BLOCK_VENDOR_NAME = {"blocked_columns": ["vendor_name"]}
+
+@pytest.fixture(params=["plan", "execute"])
+def sandbox(request):
+    sandbox = SandboxManager(SCHEMA, mode=request.param)
+    yield sandbox
+    sandbox.teardown()
+
+def _decide(sandbox, sql: str, policy: dict) -> dict:
+    simulation = mark_blocked_columns(sandbox.simulate_query(sql), compile_policy(policy))
+    assert simulation["valid"], simulation
+    return GovernanceDecisionAgent().decide(simulation, compile_policy(policy))
+
+@pytest.mark.parametrize("sql", [
+    "SELECT v.vendor_name AS vn, amount FROM transactions t JOIN vendors v ON v.id = t.vendor_id",
+    "SELECT upper(vendor_name), country FROM vendors",
+    "SELECT country FROM vendors ORDER BY vendor_name",
+    "SELECT country, count(*) FROM vendors GROUP BY vendor_name",
+    "SELECT country FROM vendors WHERE vendor_name LIKE 'Vendor 1%'",
+    "SELECT id FROM vendors UNION SELECT vendor_name FROM vendors",
+])
+def test_blocked_column_used_outside_select_list_is_denied(sandbox, sql):
+    assert _decide(sandbox, sql, BLOCK_VENDOR_NAME)["decision"] == "DENY"
+
+def test_blocked_output_column_is_filtered(sandbox):
+    decision = _decide(sandbox, "SELECT id, vendor_name, country FROM vendors", BLOCK_VENDOR_NAME)
+    assert decision["decision"] == "ALLOW_WITH_FILTERING"
+    assert decision["columns_to_filter"] == ["vendor_name"]
+
+def test_aliased_pii_is_denied_under_deny_pii(sandbox):
+    decision = _decide(sandbox, "SELECT account_name AS n FROM accounts", {"deny_pii": True})
+    assert decision["decision"] == "DENY"
+
+def test_aliased_pii_cannot_be_masked(sandbox):
+    decision = _decide(sandbox, "SELECT lower(account_name) AS n FROM accounts", {"mask_pii": True})
+    assert decision["decision"] == "DENY"
+
+def test_aliased_pii_counts_outside_governance(sandbox):
+    sql = "SELECT lower(account_name) AS n FROM accounts"
+    simulation = sandbox.simulate_query(sql)
+    assert "PII" not in simulation["column_classification"].values()
+    _, reasons = score_risk(simulation, {})
+    assert "PII columns accessed: account_name" in reasons
+    memory = SessionMemory("aliased-pii")
+    memory.append(sql, simulation)
+    assert memory.pii_queries == 1
+    remediation = suggest_remediation({"decision": "DENY"}, simulation)
+    assert remediation["suggestion"] == ["Remove or mask PII columns: account_name"]
+
+def test_duplicate_output_columns_keep_their_names(sandbox):
+    sql = "SELECT a.id, a.vendor_name, b.id, b.vendor_name FROM vendors a JOIN vendors b ON b.id = a.id + 1"
+    simulation = sandbox.simulate_query(sql)
+    assert simulation["columns_accessed"] == ["id", "vendor_name", "id", "vendor_name"]
+    assert set(simulation["column_classification"]) == {"id", "vendor_name"}
+
+def test_trailing_comment_is_accepted(sandbox):
+    simulation = sandbox.simulate_query("SELECT id, country FROM vendors -- trailing note")
+    assert simulation["valid"], simulation
+    assert simulation["columns_accessed"] == ["id", "country"]
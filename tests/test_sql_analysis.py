@@ -0,0 +1,42 @@
+import pytest
+
+from core.sql_analysis import analyze_sql
+from core.sandbox.sandbox_manager import SandboxManager, execute_query
+
+SCHEMA = {"budgets": ["id", "department", "category", "monthly_limit", "fiscal_year"]}
+
+@pytest.mark.parametrize("sql, expected", [
+    ("UPDATE budgets SET monthly_limit = 1 WHERE department = 'finance'",
+     "SELECT COUNT(*) FROM (SELECT DISTINCT budgets.rowid FROM budgets WHERE department = 'finance')"),
+    ("UPDATE OR IGNORE main.budgets AS b SET (monthly_limit, category) = (1, 'x') FROM accounts a "
+     "WHERE a.id = b.id RETURNING b.id",
+     "SELECT COUNT(*) FROM (SELECT DISTINCT b.rowid FROM main.budgets AS b, accounts a WHERE a.id = b.id)"),
+    ("UPDATE budgets b SET category = 'a, WHERE' WHERE id > 3 ORDER BY id LIMIT 5",
+     "SELECT COUNT(*) FROM (SELECT DISTINCT b.rowid FROM budgets b WHERE id > 3 ORDER BY id LIMIT 5)"),
+])
+def test_update_row_count_sql(sql, expected):
+    assert analyze_sql(sql).row_count_sql == expected
+
+def test_plan_update_with_cte():
+    sql = ("WITH f AS (SELECT department FROM budgets WHERE category = 'travel') "
+           "UPDATE budgets SET monthly_limit = monthly_limit WHERE department IN (SELECT department FROM f) "
+           "AND category = 'legal'")
+    sandbox = SandboxManager(SCHEMA, mode="plan")
+    try:
+        simulation = sandbox.simulate_query(sql)
+    finally:
+        sandbox.teardown()
+    assert simulation["valid"], simulation
+    assert simulation["tables_accessed"][0] == "budgets"
+    assert simulation["columns_accessed"] == ["monthly_limit"]
+    expected = execute_query("SELECT COUNT(*) FROM budgets WHERE category = 'legal'")["rows"][0][0]
+    assert simulation["rows_affected"] == expected
+
+def test_plan_update_with_trailing_comment():
+    sandbox = SandboxManager(SCHEMA, mode="plan")
+    try:
+        simulation = sandbox.simulate_query("UPDATE budgets SET monthly_limit = monthly_limit WHERE id = 1 -- note")
+    finally:
+        sandbox.teardown()
+    assert simulation["valid"], simulation
+    assert simulation["rows_affected"] == 1
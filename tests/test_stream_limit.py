@@ -0,0 +1,43 @@
+import sqlite3
+
+from fastapi.testclient import TestClient
+
+from api.executors import stream_slots
+from api.server import app, run_simulation
+from core.audit_logger import DB_PATH as AUDIT_DB_PATH
+
+SQL = "SELECT id, category FROM budgets"
+
+def _stream(client: TestClient):
+    return client.post("/execute/stream", json={"sql": SQL, "simulation": run_simulation(SQL), "user_input": "stream test"})
+
+def test_streams_beyond_the_limit_are_shed():
+    client = TestClient(app)
+    held = 0
+    try:
+        for _ in range(stream_slots.limit):
+            stream_slots.acquire()
+            held += 1
+        response = _stream(client)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+    finally:
+        for _ in range(held):
+            stream_slots.release()
+
+    response = _stream(client)
+    assert response.status_code == 200
+    assert response.text.splitlines()[-1].startswith('{"status": "complete"')
+    assert stream_slots.stats()["open"] == 0
+
+def test_failing_stream_is_audited_as_denied():
+    sql = "SELECT id, no_such_column FROM budgets"
+    response = TestClient(app).post("/execute/stream", json={"sql": sql, "simulation": run_simulation(SQL),
+                                                             "user_input": "failing stream"})
+    assert response.status_code == 500
+    assert "no_such_column" in response.json()["detail"]
+    assert stream_slots.stats()["open"] == 0
+    with sqlite3.connect(AUDIT_DB_PATH) as conn:
+        decisions = conn.execute("SELECT decision FROM audit_logs WHERE sql = ? AND source = 'kernel'",
+                                 (sql,)).fetchall()
+    assert decisions == [("DENIED",)]
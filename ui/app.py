@@ -201,7 +201,7 @@ if page == "Audit Logs":
 
     if st.button("🔄 Refresh") or "audit_logs" not in st.session_state:
         try:
-            logs = safe_json(requests.get(f"{API_BASE}/audit_logs", timeout=5))
+            logs = safe_json(requests.get(f"{API_BASE}/audit_logs", params={"include_simulation": True}, timeout=5))
             st.session_state["audit_logs"] = logs.get("logs", logs) if isinstance(logs, dict) else logs
         except:
             st.session_state["audit_logs"] = []
@@ -232,10 +232,17 @@ if page == "Policy Playground":
                     st.session_state["test_policy"] = policy_res["policy"]
                     what_if_res = safe_json(requests.post(f"{API_BASE}/policy/what_if", json={
                         "policy": policy_res["policy"],
-                        "sql": "SELECT v.vendor_name FROM vendors v LIMIT 1"
+                        "sql": "SELECT v.vendor_name FROM vendors v LIMIT 1",
+                        "explain": True
                     }))
                     st.success("Policy tested successfully")
                     st.json(policy_res["policy"])
+                    dry_run = what_if_res.get("dry_run")
+                    if dry_run:
+                        st.write(f"**Decision:** {dry_run.get('decision')} ({dry_run.get('status')}), "
+                                 f"projected rows: {dry_run.get('projected_rows')}")
+                        if dry_run.get("columns_filtered"):
+                            st.write(f"**Filtered columns:** {', '.join(dry_run['columns_filtered'])}")
                     if what_if_res.get("llm_explanation"):
                         st.write(what_if_res["llm_explanation"])
                 else: